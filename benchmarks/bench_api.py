@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""Latency benchmarks for api.py against the IP module emulator.
+
+Reports p50/p99 latency of get_status and post_command, and for open/close
+transitions the number of status polls and the time between the emulated lift
+stopping and the client seeing it stop.
+
+    python3 benchmarks/bench_api.py --travel-time 3 --transitions 10 --json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import aiohttp
+
+from typing import Any, Callable, Awaitable, Dict, List
+
+from emulator import Nexus21Emulator
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "..", "custom_components", "nexus21")
+)
+
+from api import Nexus21IPModule  # noqa: E402
+
+
+def percentile(samples: List[float], percent: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(samples)
+    index = max(int(round(percent / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "p50": percentile(samples, 50),
+        "p99": percentile(samples, 99),
+        "mean": sum(samples) / len(samples),
+        "max": max(samples),
+    }
+
+
+async def time_calls(call: Callable[[], Awaitable], samples: int) -> Dict[str, Any]:
+    latencies = []
+    errors = 0
+    for _ in range(samples):
+        began_at = time.perf_counter()
+        try:
+            await call()
+        except Exception:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - began_at)
+    return {**summarize(latencies), "errors": errors}
+
+
+async def bench_transitions(
+    module: Nexus21IPModule, emulator: Nexus21Emulator, transitions: int, **kwargs
+) -> Dict[str, Any]:
+    polls: List[float] = []
+    detection: List[float] = []
+    durations: List[float] = []
+    errors = 0
+
+    for i in range(transitions):
+        seen_at = None
+
+        async def progress(status, done):
+            nonlocal seen_at
+            if done:
+                seen_at = time.monotonic()
+
+        status_requests = emulator.status_requests
+        transition = module.open if i % 2 == 0 else module.close
+        try:
+            durations.append(
+                await transition(async_progress_callback=progress, **kwargs)
+            )
+        except Exception:
+            errors += 1
+            continue
+        # The status taken before the command is not part of the polling.
+        polls.append(emulator.status_requests - status_requests - 1)
+        if seen_at is not None and emulator.stopped_at is not None:
+            detection.append(seen_at - emulator.stopped_at)
+
+    return {
+        "polls_per_transition": summarize(polls),
+        "stop_detection_latency": summarize(detection),
+        "transition_duration": {**summarize(durations), "errors": errors},
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    async with Nexus21Emulator(
+        travel_time=args.travel_time,
+        latency=args.latency,
+        error_rate=args.error_rate,
+    ) as emulator, aiohttp.ClientSession() as session:
+        module = Nexus21IPModule(emulator.address, session=session)
+
+        status = await time_calls(
+            lambda: module.get_status(max_age=0), args.samples
+        )
+        # Repeating the current position's command keeps the lift still.
+        command = await time_calls(
+            lambda: module.post_command("DOWN"), args.samples
+        )
+        transitions = await bench_transitions(
+            module,
+            emulator,
+            args.transitions,
+            poll_interval=args.poll_interval,
+            timeout=args.travel_time * 3 + 10,
+        )
+
+        return {
+            "emulator": {
+                "travel_time": args.travel_time,
+                "latency": args.latency,
+                "error_rate": args.error_rate,
+                "collisions": emulator.collisions,
+            },
+            "get_status_latency": status,
+            "post_command_latency": command,
+            **transitions,
+        }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    for name, stats in report.items():
+        if name == "emulator":
+            continue
+        if not stats.get("count"):
+            print(f"{name:26} no samples")
+            continue
+        print(
+            f"{name:26} n={stats['count']:<5} p50={stats['p50']:.4f} "
+            f"p99={stats['p99']:.4f} max={stats['max']:.4f}"
+        )
+    print(f"{'device collisions':26} {report['emulator']['collisions']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--transitions", type=int, default=6)
+    parser.add_argument("--travel-time", type=float, default=3.0)
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--json", action="store_true", help="print a JSON report")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Change detection with basicevent subscriptions against the emulator.
+
+Subscribes to the emulator's events with gena.py, moves the lift and reports
+how long after the lift stopped the event arrived, and how many status
+requests were needed meanwhile (none are made in push mode).
+
+    python3 benchmarks/bench_events.py --transitions 4 --travel-time 2
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from emulator import Nexus21Emulator
+from bench_api import summarize
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "..", "custom_components", "nexus21")
+)
+
+from api import IPModuleStatusResponse, Nexus21IPModule  # noqa: E402
+from gena import Nexus21EventListener, Nexus21EventSubscription  # noqa: E402
+
+
+async def run(args: argparse.Namespace) -> None:
+    listener = Nexus21EventListener("127.0.0.1")
+    await listener.start()
+    stopped = asyncio.Event()
+    latencies = []
+
+    async with Nexus21Emulator(travel_time=args.travel_time) as emulator:
+        module = Nexus21IPModule(emulator.address)
+
+        def on_event(properties):
+            status = IPModuleStatusResponse(properties)
+            module.update_status(status)
+            if status.not_moving and emulator.stopped_at is not None:
+                latencies.append(time.monotonic() - emulator.stopped_at)
+                stopped.set()
+
+        subscription = Nexus21EventSubscription(
+            listener, emulator.address, on_event=on_event
+        )
+        subscription.start()
+        while not subscription.subscribed:
+            await asyncio.sleep(0.01)
+
+        for i in range(args.transitions):
+            stopped.clear()
+            await module.post_command("UP" if i % 2 == 0 else "DOWN")
+            await asyncio.wait_for(stopped.wait(), args.travel_time + 10)
+
+        await subscription.stop()
+        await module.aclose()
+        print(f"events received      {emulator.events_sent}")
+        print(f"status requests      {emulator.status_requests}")
+        stats = summarize(latencies)
+        print(
+            f"stop seen after      p50={stats['p50'] * 1000:.2f} ms "
+            f"max={stats['max'] * 1000:.2f} ms"
+        )
+    await listener.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transitions", type=int, default=4)
+    parser.add_argument("--travel-time", type=float, default=2.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
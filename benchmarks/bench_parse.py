@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Microbenchmark of status parsing.
+
+Compares the voluptuous path IPModuleStatusResponse used to take on every poll
+(schema validation plus string comparisons on each property access) with the
+current precomputed status, and json with the optional orjson decoder.
+
+    python3 benchmarks/bench_parse.py --number 100000
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "..", "custom_components", "nexus21")
+)
+
+from api import (  # noqa: E402
+    IPModuleStatusResponse,
+    ResponseSchema,
+    StatusResponseSchema,
+    json_loads,
+)
+
+PAYLOAD = b'{"STATUS": "OK", "VERTICAL": "MOVING", "HORIZONTAL": "NA"}'
+RESPONSE = json.loads(PAYLOAD)
+
+
+def voluptuous_path():
+    ResponseSchema(RESPONSE)
+    StatusResponseSchema(RESPONSE)
+    moving = RESPONSE["HORIZONTAL"] == "MOVING" or RESPONSE["VERTICAL"] == "MOVING"
+    up = RESPONSE["HORIZONTAL"] == "UP" or RESPONSE["VERTICAL"] == "UP"
+    down = RESPONSE["HORIZONTAL"] == "DOWN" or RESPONSE["VERTICAL"] == "DOWN"
+    return moving, moving == False, up, down
+
+
+def precomputed_path():
+    status = IPModuleStatusResponse(RESPONSE)
+    return status.moving, status.not_moving, status.up, status.down
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=100000)
+    args = parser.parse_args()
+
+    cases = {
+        "voluptuous status": voluptuous_path,
+        "precomputed status": precomputed_path,
+        "json.loads": lambda: json.loads(PAYLOAD),
+        f"{json_loads.__module__}.loads": lambda: json_loads(PAYLOAD),
+    }
+    for name, case in cases.items():
+        seconds = min(timeit.repeat(case, number=args.number, repeat=5))
+        print(f"{name:20} {seconds / args.number * 1e6:8.3f} us/call")
+
+
+if __name__ == "__main__":
+    main()
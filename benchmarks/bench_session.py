@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Per-poll latency of get_status for different HTTP session setups.
+
+  new connection  a fresh TCP connection for every poll
+  shared session  one default session also carrying other traffic, like Home
+                  Assistant's shared session
+  dedicated       the module's own single keep-alive connection
+
+    python3 benchmarks/bench_session.py --samples 500 --background 20
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import sys
+import time
+
+import aiohttp
+
+from emulator import Nexus21Emulator
+from bench_api import summarize
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "..", "custom_components", "nexus21")
+)
+
+from api import Nexus21IPModule  # noqa: E402
+
+
+async def background_traffic(session: aiohttp.ClientSession, url: str) -> None:
+    while True:
+        try:
+            async with session.get(url) as response:
+                await response.read()
+        except aiohttp.ClientError:
+            await asyncio.sleep(0.01)
+
+
+async def measure(module: Nexus21IPModule, samples: int):
+    await module.get_status(max_age=0)
+    latencies = []
+    for _ in range(samples):
+        began_at = time.perf_counter()
+        await module.get_status(max_age=0)
+        latencies.append(time.perf_counter() - began_at)
+    return summarize(latencies)
+
+
+async def run(args: argparse.Namespace) -> None:
+    async with contextlib.AsyncExitStack() as stack:
+        emulator = await stack.enter_async_context(
+            Nexus21Emulator(latency=args.latency)
+        )
+        # Other integrations talk to other hosts over the shared session.
+        others = [
+            await stack.enter_async_context(Nexus21Emulator())
+            for _ in range(1 if args.background else 0)
+        ]
+
+        fresh = await stack.enter_async_context(
+            aiohttp.ClientSession(connector=aiohttp.TCPConnector(force_close=True))
+        )
+        shared = await stack.enter_async_context(aiohttp.ClientSession())
+        background = [
+            asyncio.ensure_future(
+                background_traffic(shared, f"http://{others[0].address}/api/status")
+            )
+            for _ in range(args.background)
+        ]
+
+        try:
+            cases = {
+                "new connection": Nexus21IPModule(emulator.address, session=fresh),
+                "shared session": Nexus21IPModule(emulator.address, session=shared),
+                "dedicated": await stack.enter_async_context(
+                    Nexus21IPModule(emulator.address)
+                ),
+            }
+            for name, module in cases.items():
+                stats = await measure(module, args.samples)
+                print(
+                    f"{name:16} p50={stats['p50'] * 1000:7.3f} ms "
+                    f"p99={stats['p99'] * 1000:7.3f} ms"
+                )
+        finally:
+            for task in background:
+                task.cancel()
+            await asyncio.gather(*background, return_exceptions=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument(
+        "--background", type=int, default=0, help="concurrent requests on the shared session"
+    )
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""Soak test of a fleet of IP modules polled and commanded from one event loop.
+
+Starts `--modules` emulators in a child process and drives random open/close
+traffic at each of them. With Home Assistant installed every lift gets the
+integration's own coordinator and cover entity, added through a cover entity
+platform, otherwise each module is polled at `--poll-interval` like the
+coordinator would. The Home Assistant mode has been run against Home Assistant
+2022.10.5, newer releases are untested. Event loop lag, memory, open
+sockets, CPU per request and missed transitions are sampled throughout and
+written as a JSON report. Gates make the exit status non-zero when exceeded.
+
+    python3 benchmarks/bench_soak.py --modules 200 --duration 3600 \\
+        --output soak.json --max-loop-lag-p99 0.1 --max-missed-rate 0.001
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+from datetime import timedelta
+
+from typing import Any, Dict, List
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS, "..", "custom_components"))
+sys.path.insert(0, os.path.join(BENCHMARKS, "..", "custom_components", "nexus21"))
+
+try:
+    from homeassistant.config_entries import ConfigEntry
+    from homeassistant.const import EVENT_STATE_CHANGED
+    from homeassistant.core import HomeAssistant
+    from homeassistant.helpers import device_registry, entity_registry
+    from homeassistant.helpers.entity_platform import EntityPlatform
+
+    from nexus21 import Nexus21DataUpdateCoordinator, api
+    from nexus21.const import DOMAIN, UPDATE_INTERVAL
+    from nexus21.cover import Nexus21Cover
+    from nexus21.scheduler import Nexus21PollScheduler
+except ImportError:
+    HomeAssistant = None
+    import api  # noqa: E402
+
+Nexus21Error = api.Nexus21Error
+Nexus21Histogram = api.Nexus21Histogram
+
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+
+def rss_bytes() -> int:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def open_sockets() -> int:
+    count = 0
+    for fd in os.listdir("/proc/self/fd"):
+        try:
+            count += os.readlink(f"/proc/self/fd/{fd}").startswith("socket:")
+        except OSError:
+            pass
+    return count
+
+
+async def start_emulators(args: argparse.Namespace):
+    process = await asyncio.create_subprocess_exec(
+        sys.executable,
+        os.path.join(BENCHMARKS, "emulator.py"),
+        "--port",
+        "0",
+        "--count",
+        str(args.modules),
+        "--travel-time",
+        str(args.travel_time),
+        "--latency",
+        str(args.latency),
+        "--error-rate",
+        str(args.error_rate),
+        stdout=asyncio.subprocess.PIPE,
+    )
+    hosts = []
+    while len(hosts) < args.modules:
+        line = await process.stdout.readline()
+        if not line:
+            raise RuntimeError("emulators exited")
+        hosts.append(re.search(r"http://([^/]+)/", line.decode()).group(1))
+    return process, hosts
+
+
+class LoopLagMonitor:
+    """How late the event loop runs a callback that asked to wake up on time."""
+
+    def __init__(self, interval: float = 0.1) -> None:
+        self.interval = interval
+        self.total = Nexus21Histogram(LAG_BUCKETS)
+        self.window = Nexus21Histogram(LAG_BUCKETS)
+
+    async def run(self) -> None:
+        while True:
+            began_at = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = time.monotonic() - began_at - self.interval
+            self.total.record(lag)
+            self.window.record(lag)
+
+    def take_window(self) -> Nexus21Histogram:
+        window, self.window = self.window, Nexus21Histogram(LAG_BUCKETS)
+        return window
+
+
+class Lift:
+    """One emulated lift, its module and what the driver saw it do."""
+
+    def __init__(self, module: api.Nexus21IPModule) -> None:
+        self.module = module
+        self.coordinator = None
+        self.cover = None
+        self.transitions = 0
+        self.missed = 0
+        self.superseded = 0
+        self.errors: Dict[str, int] = {}
+
+    def count_error(self, error: BaseException) -> None:
+        name = type(error).__name__
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+    async def open(self) -> None:
+        if self.cover is not None:
+            await self.cover.async_open_cover()
+        else:
+            await self.module.open()
+
+    async def close(self) -> None:
+        if self.cover is not None:
+            await self.cover.async_close_cover()
+        else:
+            await self.module.close()
+
+
+async def setup_hass(config_dir: str):
+    """Home Assistant with a cover platform to add the lifts' entities to."""
+    try:
+        hass = HomeAssistant(config_dir)
+    except TypeError:
+        # Older releases take no arguments.
+        hass = HomeAssistant()
+        hass.config.config_dir = config_dir
+    await device_registry.async_load(hass)
+    await entity_registry.async_load(hass)
+    platform = EntityPlatform(
+        hass=hass,
+        logger=logging.getLogger(__name__),
+        domain="cover",
+        platform_name=DOMAIN,
+        platform=None,
+        scan_interval=timedelta(seconds=UPDATE_INTERVAL),
+        entity_namespace=None,
+    )
+    state_changes = [0]
+
+    def count_state_change(event) -> None:
+        state_changes[0] += 1
+
+    hass.bus.async_listen(EVENT_STATE_CHANGED, count_state_change)
+    return hass, platform, state_changes
+
+
+async def setup_lift(hass, platform, scheduler, index: int, host: str) -> Lift:
+    lift = Lift(api.registry.acquire(host))
+    if hass is None:
+        return lift
+
+    entry = ConfigEntry(
+        version=1,
+        domain=DOMAIN,
+        title=f"Lift {index}",
+        data={"name": f"Lift {index}", "ip_address": host, "mac": f"soak-{index}"},
+        source="user",
+    )
+    # Polls are scheduled from here on, as they are by the integration.
+    lift.coordinator = Nexus21DataUpdateCoordinator(
+        hass, entry, lift.module, scheduler
+    )
+    lift.cover = Nexus21Cover(lift.coordinator, entry, lift.module)
+    await platform.async_add_entities([lift.cover])
+    return lift
+
+
+async def poll(lift: Lift, interval: float) -> None:
+    """Stand-in for the coordinator without Home Assistant."""
+    await asyncio.sleep(random.uniform(0, interval))
+    while True:
+        try:
+            await lift.module.get_status()
+        except (Nexus21Error, aiohttp.ClientError, asyncio.TimeoutError) as error:
+            lift.count_error(error)
+        await asyncio.sleep(interval)
+
+
+async def drive(lift: Lift, args: argparse.Namespace) -> None:
+    """Move the lift at random, sometimes reversing it while it moves.
+
+    A transition is missed when it fails or the lift doesn't end up where it
+    was last sent.
+    """
+    while True:
+        await asyncio.sleep(random.expovariate(1 / args.command_interval))
+        status = lift.module.last_status
+        opening = status is None or not status.up
+        moves = [asyncio.ensure_future(lift.open() if opening else lift.close())]
+        if random.random() < args.reverse_rate:
+            await asyncio.sleep(random.uniform(0, args.travel_time))
+            opening = not opening
+            moves.append(
+                asyncio.ensure_future(lift.open() if opening else lift.close())
+            )
+
+        lift.transitions += 1
+        missed = False
+        for outcome in await asyncio.gather(*moves, return_exceptions=True):
+            if isinstance(outcome, api.Nexus21CommandSuperseded):
+                lift.superseded += 1
+            elif isinstance(outcome, BaseException):
+                lift.count_error(outcome)
+                missed = True
+        status = lift.module.last_status
+        if missed or status is None or not (status.up if opening else status.down):
+            lift.missed += 1
+
+
+def fleet_totals(lifts: List[Lift]) -> Dict[str, Any]:
+    errors: Dict[str, int] = {}
+    for lift in lifts:
+        for name, count in lift.errors.items():
+            errors[name] = errors.get(name, 0) + count
+    return {
+        "requests": sum(lift.module.stats.request_latency.count for lift in lifts),
+        "timeouts": sum(lift.module.stats.timeouts for lift in lifts),
+        "transitions": sum(lift.transitions for lift in lifts),
+        "superseded": sum(lift.superseded for lift in lifts),
+        "missed": sum(lift.missed for lift in lifts),
+        "errors": errors,
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    use_hass = HomeAssistant is not None and not args.api_only
+    emulators, hosts = await start_emulators(args)
+    monitor = LoopLagMonitor()
+    tasks = [asyncio.ensure_future(monitor.run())]
+    config_dir = tempfile.TemporaryDirectory()
+    hass, platform, state_changes = (
+        await setup_hass(config_dir.name) if use_hass else (None, None, [None])
+    )
+    # One scheduler polls every coordinator, as for the integration's entries.
+    scheduler = Nexus21PollScheduler(hass) if use_hass else None
+    lifts: List[Lift] = []
+
+    try:
+        rss_before, sockets_before = rss_bytes(), open_sockets()
+        lifts = [
+            await setup_lift(hass, platform, scheduler, index, host)
+            for index, host in enumerate(hosts)
+        ]
+        if not use_hass:
+            # Open every connection, as the coordinators' first refresh does.
+            await asyncio.gather(
+                *(lift.module.connect() for lift in lifts), return_exceptions=True
+            )
+        for lift in lifts:
+            if lift.coordinator is not None:
+                # Spread the first refreshes like the integration does.
+                await asyncio.sleep(args.setup_stagger)
+                await lift.coordinator.async_refresh()
+            else:
+                tasks.append(asyncio.ensure_future(poll(lift, args.poll_interval)))
+            tasks.append(asyncio.ensure_future(drive(lift, args)))
+        rss_setup = rss_bytes()
+
+        samples = []
+        began_at = time.monotonic()
+        cpu_began_at = time.process_time()
+        previous = fleet_totals(lifts)
+        previous_cpu = cpu_began_at
+        while (elapsed := time.monotonic() - began_at) < args.duration:
+            await asyncio.sleep(min(args.sample_interval, args.duration - elapsed))
+            totals, cpu = fleet_totals(lifts), time.process_time()
+            requests = totals["requests"] - previous["requests"]
+            lag = monitor.take_window()
+            samples.append(
+                {
+                    "t": round(time.monotonic() - began_at, 1),
+                    "rss": rss_bytes(),
+                    "sockets": open_sockets(),
+                    "loop_lag_p99": lag.percentile(99),
+                    "loop_lag_max": lag.max,
+                    "requests": requests,
+                    "cpu_per_request": (cpu - previous_cpu) / requests
+                    if requests
+                    else None,
+                    "transitions": totals["transitions"] - previous["transitions"],
+                    "missed": totals["missed"] - previous["missed"],
+                }
+            )
+            if args.verbose:
+                print(json.dumps(samples[-1]), file=sys.stderr)
+            previous, previous_cpu = totals, cpu
+
+        duration = time.monotonic() - began_at
+        cpu = time.process_time() - cpu_began_at
+        totals = fleet_totals(lifts)
+        cpu_per_module_second = cpu / (args.modules * duration)
+        return {
+            "config": {
+                "modules": args.modules,
+                "duration": duration,
+                "coordinator": use_hass,
+                "poll_interval": None if use_hass else args.poll_interval,
+                "command_interval": args.command_interval,
+                "reverse_rate": args.reverse_rate,
+                "travel_time": args.travel_time,
+                "latency": args.latency,
+                "error_rate": args.error_rate,
+            },
+            "memory_per_module": (rss_setup - rss_before) / args.modules,
+            "memory_growth": rss_bytes() - rss_setup,
+            "sockets": open_sockets() - sockets_before,
+            "loop_lag": monitor.total.as_dict(),
+            "cpu": cpu,
+            "cpu_per_request": cpu / totals["requests"] if totals["requests"] else None,
+            "cpu_per_module_second": cpu_per_module_second,
+            # Modules one core could keep up with at this traffic.
+            "module_ceiling": int(1 / cpu_per_module_second)
+            if cpu_per_module_second
+            else None,
+            "missed_rate": totals["missed"] / totals["transitions"]
+            if totals["transitions"]
+            else 0.0,
+            "state_changes": state_changes[0],
+            **totals,
+            "samples": samples,
+        }
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for lift in lifts:
+            if lift.coordinator is not None:
+                lift.coordinator.async_unload()
+        if scheduler is not None:
+            scheduler.async_stop()
+        for host in hosts:
+            module = api.registry.get(host)
+            if module is not None:
+                await api.registry.release(module)
+        emulators.terminate()
+        await emulators.wait()
+        config_dir.cleanup()
+
+
+def check_gates(report: Dict[str, Any], args: argparse.Namespace) -> bool:
+    gates = {
+        "loop_lag_p99": (args.max_loop_lag_p99, report["loop_lag"]["p99"]),
+        "missed_rate": (args.max_missed_rate, report["missed_rate"]),
+        "memory_per_module": (args.max_memory_per_module, report["memory_per_module"]),
+    }
+    report["gates"] = {
+        name: {"limit": limit, "value": value, "passed": value <= limit}
+        for name, (limit, value) in gates.items()
+        if limit is not None and value is not None
+    }
+    return all(gate["passed"] for gate in report["gates"].values())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        epilog="\n".join(__doc__.splitlines()[1:]),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--modules", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=300, help="seconds")
+    parser.add_argument("--sample-interval", type=float, default=60)
+    parser.add_argument(
+        "--command-interval",
+        type=float,
+        default=120,
+        help="mean seconds between commands to each lift",
+    )
+    parser.add_argument("--reverse-rate", type=float, default=0.1)
+    parser.add_argument("--poll-interval", type=float, default=10)
+    parser.add_argument("--setup-stagger", type=float, default=0.01)
+    parser.add_argument("--travel-time", type=float, default=5.0)
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--api-only", action="store_true", help="skip Home Assistant if installed"
+    )
+    parser.add_argument("--output", help="write the JSON report here, else stdout")
+    parser.add_argument("--max-loop-lag-p99", type=float)
+    parser.add_argument("--max-missed-rate", type=float)
+    parser.add_argument("--max-memory-per-module", type=float, help="bytes")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    passed = check_gates(report, args)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
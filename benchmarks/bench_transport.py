@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""CPU time per get_status poll with aiohttp and with the raw HTTP client.
+
+The emulator runs in a child process so that only the client's CPU time is
+counted.
+
+    python3 benchmarks/bench_transport.py --samples 5000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+
+from bench_api import summarize
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS, "..", "custom_components", "nexus21"))
+
+from api import Nexus21IPModule  # noqa: E402
+
+
+async def measure(host: str, raw_http: bool, samples: int):
+    async with Nexus21IPModule(host, raw_http=raw_http) as module:
+        await module.connect()
+        latencies = []
+        cpu_began_at = time.process_time()
+        for _ in range(samples):
+            began_at = time.monotonic()
+            await module.get_status(max_age=0)
+            latencies.append(time.monotonic() - began_at)
+        cpu = time.process_time() - cpu_began_at
+    return {"cpu_per_poll": cpu / samples, "latency": summarize(latencies)}
+
+
+async def run(args: argparse.Namespace):
+    emulator = await asyncio.create_subprocess_exec(
+        sys.executable,
+        os.path.join(BENCHMARKS, "emulator.py"),
+        "--port",
+        "0",
+        stdout=asyncio.subprocess.PIPE,
+    )
+    try:
+        line = (await emulator.stdout.readline()).decode()
+        host = re.search(r"http://([^/]+)/", line).group(1)
+        report = {}
+        for _ in range(args.rounds):
+            for name, raw_http in (("aiohttp", False), ("raw", True)):
+                result = await measure(host, raw_http, args.samples)
+                best = report.get(name)
+                if best is None or result["cpu_per_poll"] < best["cpu_per_poll"]:
+                    report[name] = result
+        report["reduction"] = 1 - report["raw"]["cpu_per_poll"] / (
+            report["aiohttp"]["cpu_per_poll"]
+        )
+        return report
+    finally:
+        emulator.terminate()
+        await emulator.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=3, help="best of")
+    parser.add_argument("--json", action="store_true", help="print a JSON report")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for name in ("aiohttp", "raw"):
+        result = report[name]
+        print(
+            f"{name:8} cpu/poll={result['cpu_per_poll'] * 1e6:7.1f} us  "
+            f"p50={result['latency']['p50'] * 1e3:.3f} ms  "
+            f"p99={result['latency']['p99'] * 1e3:.3f} ms"
+        )
+    print(f"CPU per poll reduced by {report['reduction']:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""Stand-in for a Nexus21 IP module.
+
+Serves /api/status and /api/command like the real module, including its limit
+of one HTTP request at a time, and pushes state changes to GENA subscribers of
+the basicevent service. Travel time, response latency and error injection are
+configurable so the client can be measured without a lift.
+
+    python3 benchmarks/emulator.py --port 8080 --travel-time 12
+"""
+
+import argparse
+import asyncio
+import contextlib
+import random
+import time
+import uuid
+
+import aiohttp
+from aiohttp import web
+from typing import Dict, Optional
+
+EVENT_PATH = "/upnp/event/basicevent1"
+PROPERTYSET = (
+    '<?xml version="1.0"?>'
+    '<e:propertyset xmlns:e="urn:schemas-upnp-org:event-1-0">{}</e:propertyset>'
+)
+
+MEMORY_POSITIONS = {"MEM1": 0.25, "MEM2": 0.5, "MEM3": 0.75}
+
+
+class Nexus21Emulator:
+    """Emulated IP module driving a single vertical lift.
+
+    Position 0 is down and 1 is up. A full travel takes `travel_time` seconds
+    and starts `start_delay` seconds after a command is accepted. A request that
+    arrives while another one is being served is refused with HTTP 503, so
+    clients that don't serialize their requests show up in `collisions`.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        travel_time: float = 5.0,
+        start_delay: float = 0.0,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        position: float = 0.0,
+        memory_positions: Dict[str, float] = None,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.travel_time = travel_time
+        self.start_delay = start_delay
+        self.latency = latency
+        self.error_rate = error_rate
+        self.memory_positions = memory_positions or dict(MEMORY_POSITIONS)
+
+        self.status_requests = 0
+        self.command_requests = 0
+        self.collisions = 0
+        self.injected_errors = 0
+        self.stopped_at: Optional[float] = None
+        """Monotonic time the lift last came, or will come, to a stop."""
+
+        self._position = position
+        self._target = position
+        self._move_from = position
+        self._move_at = time.monotonic()
+        self._busy = False
+        self._runner: Optional[web.AppRunner] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._subscribers: Dict[str, str] = {}
+        self._event_handles = []
+        self._event_seq = 0
+        self.events_sent = 0
+
+    @property
+    def address(self) -> str:
+        """host:port to hand to Nexus21IPModule."""
+        return f"{self.host}:{self.port}"
+
+    def position(self, now: float = None) -> float:
+        if now is None:
+            now = time.monotonic()
+        if self.travel_time <= 0:
+            return self._target
+        travelled = max(now - self._move_at, 0) / self.travel_time
+        if self._target >= self._move_from:
+            return min(self._move_from + travelled, self._target)
+        return max(self._move_from - travelled, self._target)
+
+    def moving(self, now: float = None) -> bool:
+        if now is None:
+            now = time.monotonic()
+        return now >= self._move_at and self.position(now) != self._target
+
+    def move_to(self, target: float) -> None:
+        now = time.monotonic()
+        self._move_from = self.position(now)
+        self._target = target
+        self._move_at = now + self.start_delay
+        self.stopped_at = self._move_at + abs(target - self._move_from) * max(
+            self.travel_time, 0
+        )
+
+        loop = asyncio.get_running_loop()
+        for handle in self._event_handles:
+            handle.cancel()
+        self._event_handles = [
+            loop.call_later(max(at - now, 0), self._notify_all)
+            for at in (self._move_at, self.stopped_at)
+        ]
+
+    def _status(self) -> Dict[str, str]:
+        return {"STATUS": "OK", "VERTICAL": self.vertical(), "HORIZONTAL": "NA"}
+
+    def _notify_all(self) -> None:
+        properties = "".join(
+            f"<e:property><{name}>{value}</{name}></e:property>"
+            for name, value in self._status().items()
+        )
+        for sid, callback in list(self._subscribers.items()):
+            asyncio.ensure_future(self._notify(sid, callback, properties))
+
+    async def _notify(self, sid: str, callback: str, properties: str) -> None:
+        self._event_seq += 1
+        try:
+            async with self._session.request(
+                "NOTIFY",
+                callback,
+                headers={
+                    "NT": "upnp:event",
+                    "NTS": "upnp:propchange",
+                    "SID": sid,
+                    "SEQ": str(self._event_seq),
+                    "CONTENT-TYPE": 'text/xml; charset="utf-8"',
+                },
+                data=PROPERTYSET.format(properties),
+            ):
+                self.events_sent += 1
+        except aiohttp.ClientError:
+            self._subscribers.pop(sid, None)
+
+    def vertical(self, now: float = None) -> str:
+        if self.moving(now):
+            return "MOVING"
+        return "DOWN" if self.position(now) <= 0 else "UP"
+
+    async def start(self) -> "Nexus21Emulator":
+        app = web.Application()
+        app.router.add_get("/api/status", self._handle_status)
+        app.router.add_post("/api/command", self._handle_command)
+        app.router.add_route("SUBSCRIBE", EVENT_PATH, self._handle_subscribe)
+        app.router.add_route("UNSUBSCRIBE", EVENT_PATH, self._handle_unsubscribe)
+        self._session = aiohttp.ClientSession()
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        if not self.port:
+            self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        for handle in self._event_handles:
+            handle.cancel()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self) -> "Nexus21Emulator":
+        return await self.start()
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    async def _serve(self, handler) -> web.Response:
+        if self._busy:
+            self.collisions += 1
+            return web.Response(status=503, text="Busy")
+        self._busy = True
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if self.error_rate and random.random() < self.error_rate:
+                self.injected_errors += 1
+                return web.json_response(
+                    {
+                        "STATUS": "ERROR",
+                        "VERTICAL": "ERROR",
+                        "HORIZONTAL": "NA",
+                        "DESCRIPTION": "Injected error",
+                    }
+                )
+            return await handler()
+        finally:
+            self._busy = False
+
+    async def _handle_status(self, request: web.Request) -> web.Response:
+        self.status_requests += 1
+
+        async def status():
+            return web.json_response(self._status())
+
+        return await self._serve(status)
+
+    async def _handle_command(self, request: web.Request) -> web.Response:
+        self.command_requests += 1
+
+        async def command():
+            body = await request.json()
+            command = body.get("COMMAND")
+            if command == "UP":
+                self.move_to(1)
+            elif command == "DOWN":
+                self.move_to(0)
+            elif command in self.memory_positions:
+                self.move_to(self.memory_positions[command])
+            else:
+                return web.json_response(
+                    {"STATUS": "ERROR", "DESCRIPTION": f"Unknown command {command}"}
+                )
+            return web.json_response({"STATUS": "OK"})
+
+        return await self._serve(command)
+
+    async def _handle_subscribe(self, request: web.Request) -> web.Response:
+        timeout = request.headers.get("TIMEOUT", "Second-1800")
+        sid = request.headers.get("SID")
+        if sid is not None:
+            if sid not in self._subscribers:
+                return web.Response(status=412)
+        else:
+            callback = request.headers.get("CALLBACK", "").strip("<>")
+            if request.headers.get("NT") != "upnp:event" or not callback:
+                return web.Response(status=412)
+            sid = f"uuid:{uuid.uuid4()}"
+            self._subscribers[sid] = callback
+        return web.Response(headers={"SID": sid, "TIMEOUT": timeout})
+
+    async def _handle_unsubscribe(self, request: web.Request) -> web.Response:
+        if self._subscribers.pop(request.headers.get("SID"), None) is None:
+            return web.Response(status=412)
+        return web.Response()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080, help="0 for any free port")
+    parser.add_argument(
+        "--count", type=int, default=1, help="emulators on consecutive ports"
+    )
+    parser.add_argument("--travel-time", type=float, default=5.0)
+    parser.add_argument("--start-delay", type=float, default=0.0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    async with contextlib.AsyncExitStack() as stack:
+        for index in range(args.count):
+            emulator = await stack.enter_async_context(
+                Nexus21Emulator(
+                    host=args.host,
+                    port=args.port + index if args.port else 0,
+                    travel_time=args.travel_time,
+                    start_delay=args.start_delay,
+                    latency=args.latency,
+                    error_rate=args.error_rate,
+                )
+            )
+            print(
+                f"Nexus21 IP module emulator on http://{emulator.address}/api/status",
+                flush=True,
+            )
+        await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
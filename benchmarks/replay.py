@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""Record exchanges with an IP module and replay them against api.py.
+
+`record` drives a lift (or the emulator) through a list of commands and saves
+every status and command exchange with its timing. `replay` feeds recordings
+back to Nexus21IPModule in place of HTTP, in virtual time by default so that
+thousands of transitions run per second of CPU time, or in real time with
+--real-time. Replays are deterministic, which makes them usable to compare
+polling strategies and to check how the transition engine handles an already
+positioned lift, a stall or an error status.
+
+    python3 benchmarks/replay.py record --host 192.168.0.39 DOWN UP -o lift.ndjson
+    python3 benchmarks/replay.py record --emulator DOWN UP MEM2 -o emulated.ndjson
+    python3 benchmarks/replay.py replay benchmarks/recordings/*.ndjson --repeat 1000
+
+A recording is a JSON header line followed by one line per exchange:
+
+    [t, duration, method, service, payload, body]
+    [t, duration, method, service, payload, null, error]
+
+where `t` is when the answer arrived, in seconds since the recording started.
+"""
+
+import argparse
+import asyncio
+import bisect
+import contextlib
+import datetime
+import json
+import os
+import selectors
+import sys
+import time
+
+import aiohttp
+
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, TextIO
+
+from emulator import Nexus21Emulator
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "..", "custom_components", "nexus21")
+)
+
+import api  # noqa: E402
+from api import Nexus21Error, Nexus21IPModule  # noqa: E402
+
+Transport = Callable[[str, str, Any], Awaitable[Any]]
+Exchange = List[Any]
+
+
+class Nexus21Recorder:
+    """Writes every exchange passing through a module's transport to `out`."""
+
+    def __init__(self, out: TextIO, host: str) -> None:
+        self.out = out
+        self.started_at: Optional[float] = None
+        self.exchanges = 0
+        out.write(
+            json.dumps(
+                {
+                    "host": host,
+                    "recorded_at": datetime.datetime.now().isoformat(
+                        timespec="seconds"
+                    ),
+                }
+            )
+            + "\n"
+        )
+
+    def record(self, transport: Transport) -> Transport:
+        async def recording_transport(method: str, service: str, payload: Any) -> Any:
+            began_at = time.monotonic()
+            if self.started_at is None:
+                self.started_at = began_at
+            try:
+                body = await transport(method, service, payload)
+            except (Nexus21Error, aiohttp.ClientError, asyncio.TimeoutError) as error:
+                self._write(began_at, method, service, payload, None, error)
+                raise
+            self._write(began_at, method, service, payload, body)
+            return body
+
+        return recording_transport
+
+    def _write(self, began_at, method, service, payload, body, error=None) -> None:
+        now = time.monotonic()
+        line = [
+            round(now - self.started_at, 4),
+            round(now - began_at, 4),
+            method,
+            service,
+            payload,
+            body,
+        ]
+        if error is not None:
+            line.append(type(error).__name__)
+        self.out.write(json.dumps(line, separators=(",", ":")) + "\n")
+        self.out.flush()
+        self.exchanges += 1
+
+
+def load_recording(path: str) -> List[Exchange]:
+    with open(path) as recording:
+        lines = iter(recording)
+        next(lines)  # header
+        return [json.loads(line) for line in lines if line.strip()]
+
+
+class Nexus21ReplayTransport:
+    """Answers a module's requests from a recording.
+
+    The recording is cut into segments at each command. A status request is
+    answered with the last status recorded at or before the same time since
+    the segment's command, so the lift behaves as it did when it was recorded
+    whatever the replayed client's polling. A command moves on to the next
+    segment, whichever command it is. Recorded request durations are kept.
+    """
+
+    def __init__(self, exchanges: List[Exchange]) -> None:
+        self._commands: List[Exchange] = []
+        self._segments: List[List[Exchange]] = [[]]
+        for exchange in exchanges:
+            if exchange[2] == "POST":
+                self._commands.append(exchange)
+                self._segments.append([])
+            else:
+                self._segments[-1].append(exchange)
+        self._offsets = []
+        origin = 0.0
+        for index, segment in enumerate(self._segments):
+            if index:
+                origin = self._commands[index - 1][0]
+            self._offsets.append([exchange[0] - origin for exchange in segment])
+        self._segment = 0
+        self._segment_at: Optional[float] = None
+
+    @property
+    def commands(self) -> List[str]:
+        return [exchange[4]["COMMAND"] for exchange in self._commands]
+
+    async def __call__(self, method: str, service: str, payload: Any) -> Any:
+        now = asyncio.get_running_loop().time()
+        if self._segment_at is None:
+            self._segment_at = now
+
+        if method == "POST":
+            if self._segment < len(self._commands):
+                self._segment += 1
+            exchange = self._commands[self._segment - 1]
+        else:
+            exchange = self._status_at(now - self._segment_at)
+
+        await asyncio.sleep(exchange[1])
+        if method == "POST":
+            self._segment_at = asyncio.get_running_loop().time()
+        if len(exchange) > 6:
+            if exchange[6] == "TimeoutError":
+                raise asyncio.TimeoutError()
+            raise aiohttp.ClientError(exchange[6])
+        return exchange[5]
+
+    def _status_at(self, elapsed: float) -> Exchange:
+        segment = self._segment
+        if self._segments[segment]:
+            # Polled sooner than any recorded poll: answer with the first one,
+            # the lift's state in between wasn't observed.
+            index = bisect.bisect_right(self._offsets[segment], elapsed) - 1
+            return self._segments[segment][max(index, 0)]
+        # Nothing was polled after this command: the lift is as it was.
+        while segment > 0:
+            segment -= 1
+            if self._segments[segment]:
+                return self._segments[segment][-1]
+        return next(s[0] for s in self._segments if s)
+
+
+class _VirtualSelector(selectors.DefaultSelector):
+    """Jumps the clock forward instead of waiting when there is no I/O."""
+
+    now = 0.0
+
+    def select(self, timeout=None):
+        events = super().select(0)
+        if not events:
+            if timeout is None:
+                return super().select(None)
+            self.now += timeout
+        return events
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    def __init__(self) -> None:
+        self._virtual_selector = _VirtualSelector()
+        super().__init__(self._virtual_selector)
+
+    def time(self) -> float:
+        return self._virtual_selector.now
+
+
+class _LoopClock:
+    """Stands in for the time module in api.py, monotonic() is the loop's time."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.monotonic = loop.time
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(time, name)
+
+
+@contextlib.contextmanager
+def virtual_time() -> Iterator[asyncio.AbstractEventLoop]:
+    loop = VirtualTimeLoop()
+    real_time, api.time = api.time, _LoopClock(loop)
+    try:
+        yield loop
+    finally:
+        api.time = real_time
+        loop.close()
+
+
+async def record(args: argparse.Namespace) -> None:
+    async with contextlib.AsyncExitStack() as stack:
+        host = args.host
+        if args.emulator:
+            emulator = await stack.enter_async_context(
+                Nexus21Emulator(travel_time=args.travel_time)
+            )
+            host = emulator.address
+        module = await stack.enter_async_context(Nexus21IPModule(host))
+        out = stack.enter_context(open(args.output, "w"))
+        recorder = Nexus21Recorder(out, host)
+        module.transport = recorder.record(module.transport)
+
+        await module.get_status(max_age=0)
+        for command in args.commands:
+            try:
+                elapsed = await module.move(command, poll_interval=args.poll_interval)
+                print(f"{command}: {elapsed:.2f} s", file=sys.stderr)
+            except (Nexus21Error, aiohttp.ClientError, asyncio.TimeoutError) as error:
+                print(f"{command}: {error!r}", file=sys.stderr)
+        print(f"{recorder.exchanges} exchanges to {args.output}", file=sys.stderr)
+
+
+async def replay(
+    exchanges: List[Exchange], args: argparse.Namespace
+) -> List[Dict[str, Any]]:
+    """Replay the recorded commands `args.repeat` times.
+
+    Travel times are learned across repeats, as they would be by a long
+    running module.
+    """
+    travel_times = api.Nexus21TravelTimes()
+    outcomes = []
+    for _ in range(args.repeat):
+        transport = Nexus21ReplayTransport(exchanges)
+        module = Nexus21IPModule(
+            "replay",
+            travel_times=travel_times,
+            poll_precision=args.precision,
+            transport=transport,
+        )
+        for command in transport.commands:
+            module.last_transition = None
+            outcome = {"command": command}
+            try:
+                await module.move(
+                    command, timeout=args.timeout, poll_interval=args.poll_interval
+                )
+            except (Nexus21Error, aiohttp.ClientError, asyncio.TimeoutError) as error:
+                outcome["error"] = type(error).__name__
+            if module.last_transition is not None:
+                outcome["polls"] = module.last_transition.polls
+                outcome["detected"] = module.last_transition.detected
+            outcomes.append(outcome)
+        await module.aclose()
+    return outcomes
+
+
+def summarize(outcomes: List[Dict[str, Any]], cpu_time: float) -> Dict[str, Any]:
+    errors: Dict[str, int] = {}
+    for outcome in outcomes:
+        if "error" in outcome:
+            errors[outcome["error"]] = errors.get(outcome["error"], 0) + 1
+    finished = [outcome for outcome in outcomes if "polls" in outcome]
+    return {
+        "transitions": len(outcomes),
+        "errors": errors,
+        "polls_per_transition": (
+            sum(outcome["polls"] for outcome in finished) / len(finished)
+            if finished
+            else None
+        ),
+        "mean_detected": (
+            sum(outcome["detected"] for outcome in finished) / len(finished)
+            if finished
+            else None
+        ),
+        "cpu_time": cpu_time,
+        "transitions_per_cpu_second": len(outcomes) / cpu_time if cpu_time else None,
+    }
+
+
+def run_replay(args: argparse.Namespace) -> Dict[str, Any]:
+    report = {}
+    for path in args.recordings:
+        exchanges = load_recording(path)
+        began_at = time.process_time()
+        if args.real_time:
+            outcomes = asyncio.run(replay(exchanges, args))
+        else:
+            with virtual_time() as loop:
+                outcomes = loop.run_until_complete(replay(exchanges, args))
+        report[path] = summarize(outcomes, time.process_time() - began_at)
+    return report
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    for path, summary in report.items():
+        print(path)
+        print(f"  transitions        {summary['transitions']}")
+        print(f"  errors             {summary['errors'] or 0}")
+        if summary["polls_per_transition"] is not None:
+            print(f"  polls/transition   {summary['polls_per_transition']:.1f}")
+            print(f"  mean detected      {summary['mean_detected']:.2f} s")
+        if summary["transitions_per_cpu_second"]:
+            print(f"  per CPU second     {summary['transitions_per_cpu_second']:.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        epilog="\n".join(__doc__.splitlines()[1:]),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    actions = parser.add_subparsers(dest="action", required=True)
+
+    record_parser = actions.add_parser("record")
+    record_parser.add_argument(
+        "commands", nargs="+", choices=sorted(api.NEXUS21_COMMANDS)
+    )
+    record_parser.add_argument("--host")
+    record_parser.add_argument("-o", "--output", required=True)
+    record_parser.add_argument(
+        "--emulator", action="store_true", help="record the emulator instead of a host"
+    )
+    record_parser.add_argument("--travel-time", type=float, default=3.0)
+    record_parser.add_argument("--poll-interval", type=float, default=0.25)
+
+    replay_parser = actions.add_parser("replay")
+    replay_parser.add_argument("recordings", nargs="+")
+    replay_parser.add_argument("--repeat", type=int, default=100)
+    replay_parser.add_argument("--real-time", action="store_true")
+    replay_parser.add_argument("--poll-interval", type=float, default=1.0)
+    replay_parser.add_argument(
+        "--precision", type=float, default=api.NEXUS21_TRANSITION_POLL_PRECISION
+    )
+    replay_parser.add_argument(
+        "--timeout", type=float, help="seconds per transition, adaptive by default"
+    )
+    replay_parser.add_argument(
+        "--json", action="store_true", help="print a JSON report"
+    )
+    args = parser.parse_args()
+
+    if args.action == "record":
+        if args.emulator == (args.host is not None):
+            parser.error("give either a host or --emulator")
+        asyncio.run(record(args))
+        return
+
+    report = run_replay(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
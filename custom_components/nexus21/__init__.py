@@ -1,15 +1,20 @@
 """The Nexus21 integration."""
 from __future__ import annotations
 
+import asyncio
+import itertools
 import logging
 import async_timeout
-from datetime import timedelta
+import time
+import voluptuous as vol
 
+from homeassistant.components.network import async_get_source_ip
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.helpers import aiohttp_client
 from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.event import async_call_later
 from homeassistant.helpers.update_coordinator import (
     CoordinatorEntity,
     DataUpdateCoordinator,
@@ -17,17 +22,33 @@ from homeassistant.helpers.update_coordinator import (
 )
 from homeassistant.const import CONF_IP_ADDRESS, CONF_MAC, CONF_NAME
 
-from .api import Nexus21IPModule
+from .api import Nexus21IPModule, IPModuleStatusResponse, registry
 from .const import (
     DOMAIN,
     NEXUS21_IP_MODULE,
     NEXUS21_COORDINATOR,
+    NEXUS21_EVENT_LISTENER,
+    NEXUS21_EVENT_SUBSCRIPTION,
+    NEXUS21_FIRST_REFRESH,
+    NEXUS21_SCHEDULER,
+    STARTUP_STAGGER,
+    STARTUP_SPREAD,
+    STATE_WRITE_COALESCE,
     UPDATE_INTERVAL,
+    UPDATE_TIMEOUT_FACTOR,
+    PUSH_UPDATE_INTERVAL,
+    MOVING_UPDATE_INTERVAL,
+    COMMAND_UPDATE_WINDOW,
 )
+from .gena import Nexus21EventListener, Nexus21EventSubscription
+from .scheduler import Nexus21PollScheduler
 
-PLATFORMS: list[Platform] = [Platform.COVER]
+PLATFORMS: list[Platform] = [Platform.COVER, Platform.SENSOR]
 _LOGGER = logging.getLogger(__name__)
 
+# Spreads the first refresh of each entry over STARTUP_SPREAD seconds.
+_startup_slots = itertools.count()
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Nexus21 from a config entry."""
@@ -39,23 +60,54 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     # TODO 3. Store an API object for your platforms to access
     # hass.data[DOMAIN][entry.entry_id] = MyApi(...)
 
-    ip_module = Nexus21IPModule(
-        entry.data[CONF_IP_ADDRESS],
-        session=aiohttp_client.async_get_clientsession(hass),
-    )
-
-    async def async_update_data():
-        status = await ip_module.get_status()
-        print(status)
+    # The module keeps its own keep-alive connection rather than sharing Home
+    # Assistant's session with every other integration. It is shared with the
+    # config flow and anything else in the process talking to the same lift.
+    ip_module = registry.acquire(entry.data[CONF_IP_ADDRESS])
+    # Filled in as setup goes, so that a failure undoes what was done.
+    data = {NEXUS21_IP_MODULE: ip_module}
+    try:
+        scheduler = hass.data[DOMAIN].setdefault(
+            NEXUS21_SCHEDULER, Nexus21PollScheduler(hass)
+        )
+        coordinator = data[NEXUS21_COORDINATOR] = Nexus21DataUpdateCoordinator(
+            hass, entry, ip_module, scheduler
+        )
 
-    coordinator = Nexus21DataUpdateCoordinator(hass, entry, ip_module)
+        # State changes are pushed by the IP module's basicevent service,
+        # polling only backs it up.
+        listener = data[NEXUS21_EVENT_LISTENER] = await _async_get_event_listener(
+            hass, ip_module.host
+        )
+        subscription = data[NEXUS21_EVENT_SUBSCRIPTION] = Nexus21EventSubscription(
+            listener,
+            ip_module.host,
+            on_event=coordinator.async_event_received,
+            on_state=coordinator.async_set_push,
+            session=aiohttp_client.async_get_clientsession(hass),
+        )
+        subscription.start()
 
-    hass.data[DOMAIN][entry.entry_id] = {
-        NEXUS21_IP_MODULE: ip_module,
-        NEXUS21_COORDINATOR: coordinator,
-    }
+        # Entities start from their restored state, the IP module is contacted
+        # in the background so a slow or offline lift doesn't hold up startup.
+        # Not a tracked task, which startup would wait for before completing.
+        refresh = _async_first_refresh(
+            coordinator, next(_startup_slots) * STARTUP_STAGGER % STARTUP_SPREAD
+        )
+        if hasattr(entry, "async_create_background_task"):
+            data[NEXUS21_FIRST_REFRESH] = entry.async_create_background_task(
+                hass, refresh, f"{DOMAIN} first refresh {entry.title}"
+            )
+        else:
+            # Home Assistant before 2023.4.
+            data[NEXUS21_FIRST_REFRESH] = hass.loop.create_task(refresh)
 
-    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+        hass.data[DOMAIN][entry.entry_id] = data
+        await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    except BaseException:
+        hass.data[DOMAIN].pop(entry.entry_id, None)
+        await _async_stop_entry(hass, data)
+        raise
 
     return True
 
@@ -63,24 +115,193 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
+        await _async_stop_entry(hass, hass.data[DOMAIN].pop(entry.entry_id))
 
     return unload_ok
 
 
+async def _async_stop_entry(hass: HomeAssistant, data: dict) -> None:
+    """Undo the setup of an entry, as far as it got."""
+    if (first_refresh := data.get(NEXUS21_FIRST_REFRESH)) is not None:
+        first_refresh.cancel()
+    if (subscription := data.get(NEXUS21_EVENT_SUBSCRIPTION)) is not None:
+        await subscription.stop()
+    if (listener := data.get(NEXUS21_EVENT_LISTENER)) is not None and listener.idle:
+        listeners = hass.data[DOMAIN].get(NEXUS21_EVENT_LISTENER, {})
+        if listeners.get(listener.host) is listener:
+            del listeners[listener.host]
+        await listener.stop()
+    if (coordinator := data.get(NEXUS21_COORDINATOR)) is not None:
+        coordinator.async_unload()
+    await registry.release(data[NEXUS21_IP_MODULE])
+
+    if hass.data[DOMAIN].keys() <= {NEXUS21_EVENT_LISTENER, NEXUS21_SCHEDULER}:
+        if NEXUS21_SCHEDULER in hass.data[DOMAIN]:
+            hass.data[DOMAIN].pop(NEXUS21_SCHEDULER).async_stop()
+        for listener in hass.data[DOMAIN].pop(NEXUS21_EVENT_LISTENER, {}).values():
+            await listener.stop()
+
+
+async def _async_first_refresh(
+    coordinator: Nexus21DataUpdateCoordinator, delay: float
+) -> None:
+    await asyncio.sleep(delay)
+    await coordinator.async_refresh()
+
+
+async def _async_get_event_listener(
+    hass: HomeAssistant, host: str
+) -> Nexus21EventListener:
+    """Return the listener for NOTIFY requests from `host`.
+
+    Entries share a listener per source address, so that every IP module gets
+    a callback URL on the network it can reach Home Assistant from.
+    """
+    source_ip = await async_get_source_ip(hass, target_ip=host.partition(":")[0])
+    listeners = hass.data[DOMAIN].setdefault(NEXUS21_EVENT_LISTENER, {})
+    if source_ip not in listeners:
+        listeners[source_ip] = Nexus21EventListener(source_ip)
+    listener = listeners[source_ip]
+    await listener.start()
+    return listener
+
+
 class Nexus21DataUpdateCoordinator(DataUpdateCoordinator):
-    """My custom coordinator."""
+    """Single source of status for the entities of one IP module.
 
-    def __init__(self, hass, config_entry: ConfigEntry, ip_module: Nexus21IPModule):
+    Polls quickly while the lift moves and nothing else is polling it, and
+    slowly at rest. Statuses the IP module gets elsewhere, from transitions or
+    events, are taken as they arrive instead of being fetched again. When to
+    poll is left to the domain's Nexus21PollScheduler.
+    """
+
+    def __init__(
+        self,
+        hass,
+        config_entry: ConfigEntry,
+        ip_module: Nexus21IPModule,
+        scheduler: Nexus21PollScheduler,
+    ):
         """Initialize my coordinator."""
         super().__init__(
             hass,
             _LOGGER,
             name="Nexus21",
-            # Polling interval. Will only be polled if there are subscribers.
-            update_interval=timedelta(seconds=UPDATE_INTERVAL),
+            # Polled by the scheduler rather than a timer of its own.
+            update_interval=None,
         )
         self.ip_module = ip_module
+        # Seconds the scheduler waits between polls, and when the module was
+        # last polled or sent a status.
+        self.poll_interval = UPDATE_INTERVAL
+        self.polled_at: float | None = None
+        self._scheduler = scheduler
+        self._subscribed = False
+        # Whether an event has arrived since subscribing, and no change was
+        # seen by a poll first.
+        self._events_arriving = False
+        self.events_received = 0
+        self._fetching = False
+        self._notified_state = None
+        # Listener updates sent and left out because nothing had changed.
+        self.updates_notified = 0
+        self.updates_suppressed = 0
+        self._unsub_status = ip_module.add_status_listener(self._async_status_received)
+        self._unsub_scheduler = scheduler.async_add(self)
+
+    @callback
+    def async_unload(self) -> None:
+        self._unsub_status()
+        self._unsub_scheduler()
+
+    @callback
+    def async_scheduled_refresh(self) -> None:
+        """Poll, if anything listens and no poll is in progress."""
+        self.polled_at = time.monotonic()
+        if self._listeners and not self._fetching:
+            self.hass.async_create_task(self.async_refresh())
+
+    @callback
+    def _async_status_received(self, status: IPModuleStatusResponse) -> None:
+        if not self._fetching:
+            self.async_set_updated_data(status)
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update entities only when something they show has changed.
+
+        Every poll and event hands over a status, most of them the same as the
+        one before.
+        """
+        state = (
+            self.last_update_success,
+            self.data,
+            self.ip_module.available,
+            self.ip_module.position_estimator.moving,
+        )
+        if state == self._notified_state:
+            self.updates_suppressed += 1
+            return
+        self._notified_state = state
+        self.updates_notified += 1
+        super().async_update_listeners()
+
+    @callback
+    def async_set_updated_data(self, data) -> None:
+        # A status from elsewhere is as good as a poll.
+        self.polled_at = time.monotonic()
+        self._async_set_update_interval(data)
+        super().async_set_updated_data(data)
+
+    @callback
+    def _async_set_update_interval(self, status: IPModuleStatusResponse | None) -> None:
+        ip_module = self.ip_module
+        if ip_module.in_transition:
+            # The transition's polls arrive through the status listener.
+            seconds = UPDATE_INTERVAL
+        elif status is not None and status.moving:
+            seconds = MOVING_UPDATE_INTERVAL
+        elif (
+            time.monotonic() - ip_module.last_command_at < COMMAND_UPDATE_WINDOW
+            and ip_module.position_estimator.moving
+        ):
+            # Commanded, but the lift hasn't been seen to stop yet.
+            seconds = MOVING_UPDATE_INTERVAL
+        elif self._subscribed and self._events_arriving:
+            seconds = PUSH_UPDATE_INTERVAL
+        else:
+            seconds = UPDATE_INTERVAL
+        self.poll_interval = seconds
+        self._scheduler.async_reschedule(self)
+
+    @callback
+    def async_event_received(self, properties: dict[str, str]) -> None:
+        """Take a status pushed by the IP module, or fetch it if incomplete."""
+        self.events_received += 1
+        if not self._events_arriving:
+            self._events_arriving = True
+            self._async_set_update_interval(self.data)
+        try:
+            status = IPModuleStatusResponse({"STATUS": "OK", **properties})
+        except vol.Invalid:
+            self.hass.async_create_task(self.async_request_refresh())
+            return
+        self.ip_module.update_status(status)
+
+    @callback
+    def async_set_push(self, subscribed: bool) -> None:
+        """Poll slowly while events arrive, normally when they don't.
+
+        A subscription alone doesn't mean events get through, e.g. when the IP
+        module can't reach the callback URL, so polling only slows down once
+        the first event has arrived.
+        """
+        self._subscribed = subscribed
+        self._events_arriving = False
+        self._async_set_update_interval(self.data)
+        if subscribed:
+            # Catch up on anything missed while unsubscribed.
+            self.hass.async_create_task(self.async_request_refresh())
 
     async def _async_update_data(self):
         """Fetch data from API endpoint.
@@ -88,16 +309,39 @@ class Nexus21DataUpdateCoordinator(DataUpdateCoordinator):
         This is the place to pre-process the data to lookup tables
         so entities can quickly look up their data.
         """
+        self._fetching = True
+        previous, events_received = self.data, self.events_received
+        if self.polled_at is None:
+            self.polled_at = time.monotonic()
         try:
             # Note: asyncio.TimeoutError and aiohttp.ClientError are already
             # handled by the data update coordinator.
-            async with async_timeout.timeout(10):
-                return await self.ip_module.get_status()
+            # Room to wait for one queued request ahead of this one.
+            async with async_timeout.timeout(
+                UPDATE_TIMEOUT_FACTOR * self.ip_module.request_timeout
+            ):
+                status = await self.ip_module.get_status()
         except Exception as error:
+            self._async_set_update_interval(None)
             raise UpdateFailed(f"Error communicating with Nexus21 IP Module: {error}")
+        finally:
+            self._fetching = False
+        if (
+            self._events_arriving
+            and self.events_received == events_received
+            and previous is not None
+            and status != previous
+        ):
+            # A change no event told of, events stopped getting through.
+            self._events_arriving = False
+        self._async_set_update_interval(status)
+        return status
 
 
 class Nexus21Entity(CoordinatorEntity):
+    _unsub_coalesced_write: CALLBACK_TYPE | None = None
+    _written_at = float("-inf")
+
     def __init__(
         self,
         coordinator: DataUpdateCoordinator,
@@ -127,4 +371,40 @@ class Nexus21Entity(CoordinatorEntity):
     @property
     def available(self):
         """Return if the device is online."""
-        return True
+        return super().available and self._ip_module.available
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        self._async_write_coalesced()
+
+    @callback
+    def _async_write_coalesced(self) -> None:
+        """Write the state now, or once at the end of the coalescing window."""
+        if self._unsub_coalesced_write is not None:
+            return
+        wait = self._written_at + STATE_WRITE_COALESCE - time.monotonic()
+        if wait <= 0:
+            self._async_write_now()
+        else:
+            self._unsub_coalesced_write = async_call_later(
+                self.hass, wait, self._async_write_now
+            )
+
+    @callback
+    def _async_write_immediately(self) -> None:
+        """Write the state at once, dropping any write waiting in the window."""
+        if self._unsub_coalesced_write is not None:
+            self._unsub_coalesced_write()
+        self._async_write_now()
+
+    @callback
+    def _async_write_now(self, now=None) -> None:
+        self._unsub_coalesced_write = None
+        self._written_at = time.monotonic()
+        self.async_write_ha_state()
+
+    async def async_will_remove_from_hass(self) -> None:
+        if self._unsub_coalesced_write is not None:
+            self._unsub_coalesced_write()
+            self._unsub_coalesced_write = None
+        await super().async_will_remove_from_hass()
@@ -1,17 +1,40 @@
 import asyncio
 import aiohttp
+import contextlib
+import ipaddress
+import logging
 import time
 import voluptuous as vol
 
+from bisect import bisect_left
+from collections import deque
+from dataclasses import dataclass, field
 from enum import Enum
-from mimetypes import init
-from typing import Any, Set, Awaitable, Callable, Literal, TypedDict, Optional, Union
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    List,
+    Set,
+    Awaitable,
+    Callable,
+    Deque,
+    Literal,
+    TypedDict,
+    Optional,
+    Tuple,
+    Union,
+)
+from urllib.parse import urlsplit
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 # TODO
-#   Keep a last known state
 #   Convert strings to constants
-#   Logger
-#   Transistion timing in log statements
 #   JSON Error codes
 #   Tests
 
@@ -24,15 +47,62 @@ class Nexus21Command(Enum):
     MEM3 = "MEM3"
 
 
+# Seconds a transition may take while the travel time of the lift is unknown.
+# Once it is known the deadline is the expected travel time times the factor,
+# plus the margin and a few request timeouts.
 NEXUS21_TRANSITION_TIMEOUT = 30
+NEXUS21_TRANSITION_TIMEOUT_FACTOR = 1.5
+NEXUS21_TRANSITION_TIMEOUT_MARGIN = 3
 NEXUS21_TRANSITION_POLL_INTERVAL = 1
+# Once the travel time of a lift is known, the stop is detected within this many
+# seconds of the expected finish.
+NEXUS21_TRANSITION_POLL_PRECISION = 0.25
+NEXUS21_TRANSITION_MAX_POLL_INTERVAL = 5
+NEXUS21_TRAVEL_TIME_SMOOTHING = 0.3
+# Seconds a status is served from the cache before the IP module is asked again.
+NEXUS21_STATUS_TTL = 1
+# Seconds between the polls of watch() while the lift stands still and while
+# it moves, and the statuses buffered per watcher before the oldest is dropped.
+NEXUS21_WATCH_INTERVAL = 10
+NEXUS21_WATCH_MOVING_INTERVAL = 1
+NEXUS21_WATCH_BUFFER = 16
+# Seconds an idle keep-alive connection to an IP module is kept open.
+NEXUS21_KEEPALIVE_TIMEOUT = 60
+# Largest response, headers included, the raw HTTP client reads from a module.
+NEXUS21_RAW_MAX_RESPONSE = 8192
+# Seconds a single HTTP request to an IP module may take before round trips
+# have been measured. Afterwards the timeout follows the measured round trip
+# time, within the bounds.
+NEXUS21_REQUEST_TIMEOUT = 5
+NEXUS21_REQUEST_MIN_TIMEOUT = 1
+NEXUS21_REQUEST_MAX_TIMEOUT = 15
+# Consecutive failures after which requests to an IP module fail at once, and
+# the back-off before one request is let through to check it has recovered.
+NEXUS21_BREAKER_THRESHOLD = 3
+NEXUS21_BREAKER_BACKOFF = 5
+NEXUS21_BREAKER_MAX_BACKOFF = 300
+# Probing hosts for an IP module. The timeout shrinks towards a multiple of the
+# slowest answer seen so far, but never below the minimum.
+NEXUS21_PROBE_TIMEOUT = 1
+NEXUS21_PROBE_MIN_TIMEOUT = 0.3
+NEXUS21_PROBE_TIMEOUT_FACTOR = 4
+NEXUS21_PROBE_CONCURRENCY = 64
+# Upper bounds, in seconds, of the buckets latencies are counted in.
+NEXUS21_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+NEXUS21_DURATION_BUCKETS = (1, 2, 5, 10, 15, 20, 25, 30, 45, 60)
+NEXUS21_POLL_COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34)
+# Most HTTP requests a Nexus21Fleet has in flight at once, across all IP modules.
+NEXUS21_FLEET_MAX_CONCURRENCY = 32
 NEXUS21_COMMANDS: Set[str] = set(["UP", "DOWN", "MEM1", "MEM2", "MEM3"])
+NEXUS21_MEMORY_COMMANDS: Set[str] = set(["MEM1", "MEM2", "MEM3"])
 NEXUS21_STATUS: str = "status"
 NEXUS21_COMMAND: str = "command"
 NEXUS21_SERVICES: Set[str] = [NEXUS21_STATUS, NEXUS21_COMMAND]
 
 Nexus21ServiceCommands = Literal["UP", "DOWN", "MEM1", "MEM2", "MEM3"]
 
+_LOGGER = logging.getLogger(__name__)
+
 
 class Response(TypedDict):
     STATUS: Literal["OK", "ERROR"]
@@ -87,62 +157,127 @@ CommandResponseSchema = ResponseSchema.extend(
 )
 
 
+class Nexus21Vertical(Enum):
+    UP = "UP"
+    DOWN = "DOWN"
+    MOVING = "MOVING"
+    ERROR = "ERROR"
+
+
+class Nexus21Horizontal(Enum):
+    LEFT = "LEFT"
+    CENTER = "CENTER"
+    RIGHT = "RIGHT"
+    MOVING = "MOVING"
+    NA = "NA"
+    MEM1 = "MEM1"
+    MEM2 = "MEM2"
+    MEM3 = "MEM3"
+
+
+# Precompiled lookups for the schemas above. Anything they don't accept is handed
+# to the schema itself so errors are the same vol.Invalid as before.
+_RESPONSE_STATUSES: Dict[str, str] = {"OK": "OK", "ERROR": "ERROR"}
+_VERTICAL_STATES: Dict[str, Nexus21Vertical] = {
+    state.value: state for state in Nexus21Vertical
+}
+_HORIZONTAL_STATES: Dict[str, Nexus21Horizontal] = {
+    state.value: state for state in Nexus21Horizontal
+}
+
+
+def _lookup(states: Dict[str, Any], response: Any, key: str, schema: vol.Schema):
+    try:
+        return states[response[key]]
+    except (KeyError, TypeError, IndexError):
+        schema(response)
+        raise vol.Invalid(f"Unexpected {key} in IP Module response", path=[key])
+
+
 class IPModuleResponse:
-    _response: Response
+    __slots__ = ("status", "ok", "not_ok", "description")
+
+    status: str
+    ok: bool
+    not_ok: bool
+    description: Union[str, None]
 
     def __init__(self, response: Response):
-        ResponseSchema(response)
-        self._response = response
+        self.status = _lookup(_RESPONSE_STATUSES, response, "STATUS", ResponseSchema)
+        self.ok = self.status == "OK"
+        self.not_ok = not self.ok
+        self.description = response.get("DESCRIPTION")
 
-    @property
-    def ok(self) -> bool:
-        return self._response["STATUS"] == "OK"
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(status={self.status!r})"
 
-    @property
-    def not_ok(self) -> bool:
-        return self._response["STATUS"] == "ERROR"
+    def _key(self) -> Tuple:
+        return (self.status, self.description)
 
-    @property
-    def description(self) -> Union[str, None]:
-        return self._response.get("DESCRIPTION")
+    def __eq__(self, other: Any) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._key() == other._key()
 
-    @property
-    def status(self) -> str:
-        return self._response["STATUS"]
+    def __hash__(self) -> int:
+        return hash(self._key())
 
 
 class IPModuleStatusResponse(IPModuleResponse):
+    __slots__ = (
+        "vertical",
+        "horizontal",
+        "extcmd",
+        "moving",
+        "not_moving",
+        "up",
+        "down",
+    )
 
-    _response: StatusResponse
+    vertical: Nexus21Vertical
+    horizontal: Nexus21Horizontal
+    extcmd: Optional[Any]
+    moving: bool
+    not_moving: bool
+    up: bool
+    down: bool
 
     def __init__(self, response: StatusResponse):
         super().__init__(response)
-        StatusResponseSchema(response)
-        self._response = response
+        self.vertical = _lookup(
+            _VERTICAL_STATES, response, "VERTICAL", StatusResponseSchema
+        )
+        self.horizontal = _lookup(
+            _HORIZONTAL_STATES, response, "HORIZONTAL", StatusResponseSchema
+        )
+        self.extcmd = response.get("EXTCMD")
+        self.moving = (
+            self.vertical is Nexus21Vertical.MOVING
+            or self.horizontal is Nexus21Horizontal.MOVING
+        )
+        self.not_moving = not self.moving
+        self.up = self.vertical is Nexus21Vertical.UP
+        self.down = self.vertical is Nexus21Vertical.DOWN
 
-    @property
-    def moving(self) -> bool:
+    def __repr__(self) -> str:
         return (
-            self._response["HORIZONTAL"] == "MOVING"
-            or self._response["VERTICAL"] == "MOVING"
+            f"{type(self).__name__}(status={self.status!r}, "
+            f"vertical={self.vertical.value!r}, horizontal={self.horizontal.value!r})"
         )
 
-    @property
-    def not_moving(self) -> bool:
-        return self.moving == False
+    def _key(self) -> Tuple:
+        return (self.status, self.description, self.vertical, self.horizontal)
 
-    @property
-    def up(self) -> bool:
-        return (
-            self._response["HORIZONTAL"] == "UP" or self._response["VERTICAL"] == "UP"
-        )
+    def __eq__(self, other: Any) -> bool:
+        equal = super().__eq__(other)
+        if equal is True:
+            # EXTCMD may be anything, so it takes part in equality but not in
+            # the hash.
+            return self.extcmd == other.extcmd
+        return equal
 
-    @property
-    def down(self) -> bool:
-        return (
-            self._response["HORIZONTAL"] == "DOWN"
-            or self._response["VERTICAL"] == "DOWN"
-        )
+    # Defining __eq__ drops the inherited __hash__.
+    __hash__ = IPModuleResponse.__hash__
 
 
 class Nexus21Error(Exception):
@@ -171,73 +306,1203 @@ class Nexus21InvalidResponse(Nexus21Error):
         )
 
 
+class Nexus21CommandSuperseded(Nexus21Error):
+    def __init__(self, command: str, superseded_by: str):
+        super().__init__(
+            f"'{command}' was not sent to IP Module, '{superseded_by}' replaced it."
+        )
+
+
+class Nexus21TransitionSuperseded(Nexus21CommandSuperseded):
+    def __init__(self, command: str, superseded_by: str):
+        Nexus21Error.__init__(
+            self, f"'{command}' was stopped short, '{superseded_by}' replaced it."
+        )
+
+
+class Nexus21RawUnsupported(Nexus21Error):
+    """The raw HTTP client can't handle this request or response."""
+
+
+class Nexus21ModuleUnavailable(Nexus21Error):
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(
+            f"IP Module {host} is not responding, it will be tried again in {retry_in:.0f} s."
+        )
+
+
+class Nexus21CircuitBreaker:
+    """Stops requests to an IP module that keeps failing.
+
+    After `threshold` consecutive failures requests fail at once. When the
+    back-off has passed a single request is let through: success closes the
+    breaker, failure doubles the back-off.
+    """
+
+    def __init__(
+        self,
+        threshold: int = NEXUS21_BREAKER_THRESHOLD,
+        backoff: float = NEXUS21_BREAKER_BACKOFF,
+        max_backoff: float = NEXUS21_BREAKER_MAX_BACKOFF,
+    ) -> None:
+        self.threshold = threshold
+        self.min_backoff = backoff
+        self.max_backoff = max_backoff
+        self.failures = 0
+        self.backoff = backoff
+        self._retry_at = 0.0
+        self._probing = False
+
+    @property
+    def closed(self) -> bool:
+        return self.failures < self.threshold
+
+    @property
+    def retry_in(self) -> float:
+        return max(self._retry_at - time.monotonic(), 0)
+
+    def allow(self) -> bool:
+        """Whether a request may be sent, called once before each request."""
+        if self.closed:
+            return True
+        if self._probing or time.monotonic() < self._retry_at:
+            return False
+        self._probing = True
+        return True
+
+    def success(self) -> None:
+        self.failures = 0
+        self.backoff = self.min_backoff
+        self._probing = False
+
+    def failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.failures > self.threshold:
+            self.backoff = min(self.backoff * 2, self.max_backoff)
+        if not self.closed:
+            self._retry_at = time.monotonic() + self.backoff
+
+    def abandon(self) -> None:
+        """The request let through was cancelled before it had a result."""
+        self._probing = False
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "closed": self.closed,
+            "failures": self.failures,
+            "backoff": self.backoff,
+            "retry_in": self.retry_in,
+        }
+
+
+class Nexus21RoundTripTimer:
+    """Request timeout derived from measured round trip times.
+
+    Keeps a smoothed round trip time and its mean deviation the way TCP does
+    (RFC 6298): the timeout is srtt + 4 * rttvar, so a quick module on a quiet
+    LAN fails fast and a slow or jittery one gets the time it needs. Each
+    timeout doubles it until a request succeeds again.
+    """
+
+    def __init__(
+        self,
+        initial: float = NEXUS21_REQUEST_TIMEOUT,
+        minimum: float = NEXUS21_REQUEST_MIN_TIMEOUT,
+        maximum: float = NEXUS21_REQUEST_MAX_TIMEOUT,
+    ) -> None:
+        self.minimum = minimum
+        self.maximum = maximum
+        self.srtt: Optional[float] = None
+        self.rttvar: Optional[float] = None
+        self._timeout = initial
+        self._backoff = 1
+
+    @property
+    def timeout(self) -> float:
+        return min(self._timeout * self._backoff, self.maximum)
+
+    def sample(self, rtt: float) -> None:
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar += 0.25 * (abs(self.srtt - rtt) - self.rttvar)
+            self.srtt += 0.125 * (rtt - self.srtt)
+        self._timeout = min(max(self.srtt + 4 * self.rttvar, self.minimum), self.maximum)
+        self._backoff = 1
+
+    def timed_out(self) -> None:
+        if self.timeout < self.maximum:
+            self._backoff *= 2
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"srtt": self.srtt, "rttvar": self.rttvar, "timeout": self.timeout}
+
+
+class Nexus21TravelTimes:
+    """Learned travel time of a lift for each command, in seconds."""
+
+    def __init__(self, smoothing: float = NEXUS21_TRAVEL_TIME_SMOOTHING) -> None:
+        self._smoothing = smoothing
+        self._expected: Dict[str, float] = {}
+
+    def expected(self, command: Nexus21ServiceCommands) -> Optional[float]:
+        return self._expected.get(command)
+
+    def learn(self, command: Nexus21ServiceCommands, duration: float) -> None:
+        previous = self._expected.get(command)
+        if previous is None:
+            self._expected[command] = duration
+        else:
+            self._expected[command] = previous + self._smoothing * (
+                duration - previous
+            )
+
+    def as_dict(self) -> Dict[str, float]:
+        return dict(self._expected)
+
+    def restore(self, expected: Dict[str, float]) -> None:
+        """Take travel times saved from as_dict(), learned ones are kept."""
+        for command, duration in expected.items():
+            self._expected.setdefault(command, duration)
+
+
+class Nexus21PositionEstimator:
+    """Position of a lift between polls, from 0 (down) to 100 (up).
+
+    The position is interpolated from the learned travel times while the lift
+    moves and corrected whenever a status arrives. Memory positions are learned
+    when a MEM command moves the lift away from the top or bottom.
+    """
+
+    def __init__(self, travel_times: Nexus21TravelTimes) -> None:
+        self.travel_times = travel_times
+        self.memory: Dict[str, float] = {}
+        self._position: Optional[float] = None
+        self._at = 0.0
+        self._command: Optional[str] = None
+        """Command the lift is moving for, None while it stands still."""
+        self._target: Optional[float] = None
+        self._origin: Optional[float] = None
+
+    @property
+    def moving(self) -> bool:
+        return self._command is not None
+
+    @property
+    def direction(self) -> int:
+        """1 while moving up, -1 while moving down, 0 otherwise or if unknown."""
+        if self._target is None or self._position is None:
+            return 0
+        return (self._target > self._position) - (self._target < self._position)
+
+    def _speed(self, direction: int) -> Optional[float]:
+        travel_time = self.travel_times.expected(
+            Nexus21Command.UP.name if direction > 0 else Nexus21Command.DOWN.name
+        )
+        return 100 / travel_time if travel_time else None
+
+    def position(self, now: float = None) -> Optional[float]:
+        direction = self.direction
+        if not direction:
+            return self._position
+        speed = self._speed(direction)
+        if speed is None:
+            return self._position
+
+        if now is None:
+            now = time.monotonic()
+        position = self._position + direction * speed * (now - self._at)
+        if direction > 0:
+            return min(position, self._target)
+        return max(position, self._target)
+
+    def expected_travel(self, command: Nexus21ServiceCommands) -> Optional[float]:
+        """Seconds the lift should take to carry out `command` from here."""
+        position = self.position()
+        target = self._target_of(command)
+        if position is None or target is None:
+            return self.travel_times.expected(command)
+        speed = self._speed(1 if target > position else -1)
+        if speed is None:
+            return self.travel_times.expected(command)
+        return abs(target - position) / speed
+
+    def restore(self, position: Optional[float], memory: Dict[str, float]) -> None:
+        """Take a saved position and memory positions unless better ones are known."""
+        if self._position is None and not self.moving:
+            self._position = position
+        for command, memory_position in memory.items():
+            self.memory.setdefault(command, memory_position)
+
+    def memory_near(self, position: float, tolerance: float) -> Optional[str]:
+        """Memory command whose learned position is within `tolerance` of `position`."""
+        nearest = min(
+            self.memory, key=lambda slot: abs(self.memory[slot] - position), default=None
+        )
+        if nearest is not None and abs(self.memory[nearest] - position) <= tolerance:
+            return nearest
+        return None
+
+    def _target_of(self, command: str) -> Optional[float]:
+        if command == Nexus21Command.UP.name:
+            return 100
+        elif command == Nexus21Command.DOWN.name:
+            return 0
+        return self.memory.get(command)
+
+    def start(self, command: Nexus21ServiceCommands) -> None:
+        now = time.monotonic()
+        self._position = self.position(now)
+        self._at = now
+        self._command = command
+        self._target = self._target_of(command)
+        self._origin = self._position
+
+    def correct(self, status: IPModuleStatusResponse) -> None:
+        now = time.monotonic()
+        if status.moving:
+            if not self.moving:
+                # Moved by the remote, the direction is unknown.
+                self._position = self.position(now)
+                self._at = now
+                self._command = "?"
+                self._target = None
+            return
+
+        command = self._command
+        if status.down:
+            self._position = 0
+        elif command in NEXUS21_MEMORY_COMMANDS:
+            self._position = self._memory_position(command, now)
+        elif status.up and (command is not None or self._position is None):
+            # UP is reported at the memory positions as well, so an idle lift
+            # keeps its estimate.
+            self._position = 100
+        else:
+            self._position = self.position(now)
+        self._at = now
+        self._command = None
+        self._target = None
+
+    def _memory_position(self, command: str, now: float) -> Optional[float]:
+        if command in self.memory:
+            return self.memory[command]
+
+        # Learn where the memory is from the time taken to get there from
+        # the top or the bottom.
+        if self._origin not in (0, 100):
+            return None
+        direction = 1 if self._origin == 0 else -1
+        speed = self._speed(direction)
+        if speed is None:
+            return None
+        position = self._origin + direction * speed * (now - self._at)
+        self.memory[command] = min(max(position, 1), 99)
+        return self.memory[command]
+
+
+class Nexus21PollSchedule:
+    """Poll delays for one transition.
+
+    Until the travel time is known the lift is polled every `poll_interval`.
+    Afterwards polls halve the remaining expected travel time, are spaced by
+    `precision` around the expected finish and back off exponentially when the
+    lift runs long.
+    """
+
+    def __init__(
+        self,
+        expected: Optional[float],
+        poll_interval: float = NEXUS21_TRANSITION_POLL_INTERVAL,
+        precision: float = NEXUS21_TRANSITION_POLL_PRECISION,
+        max_interval: float = NEXUS21_TRANSITION_MAX_POLL_INTERVAL,
+    ) -> None:
+        self.expected = expected
+        self.poll_interval = poll_interval
+        self.precision = precision
+        self.max_interval = max_interval
+        self._overrun_polls = 0
+
+    def next_delay(self, elapsed: float) -> float:
+        if self.expected is None:
+            return self.poll_interval
+
+        remaining = self.expected - elapsed
+        if remaining > self.precision:
+            return min(max(remaining / 2, self.precision), self.max_interval)
+        elif remaining > -self.precision:
+            return self.precision
+
+        self._overrun_polls += 1
+        return min(self.precision * 2**self._overrun_polls, self.max_interval)
+
+
+@dataclass
+class Nexus21TransitionReport:
+    command: str
+    expected: Optional[float]
+    """Learned travel time when the transition started, None if unknown."""
+    actual: Optional[float]
+    """Estimated travel time, None if the lift never moved."""
+    detected: float
+    """Seconds between sending the command and seeing the lift stop."""
+    polls: int
+
+
+class Nexus21Histogram:
+    """Counts of values in fixed buckets, cheap enough to record every request."""
+
+    __slots__ = ("buckets", "counts", "count", "total", "max")
+
+    def __init__(self, buckets: Tuple[float, ...] = NEXUS21_LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        # The last count is for values above the largest bucket.
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Upper bound of the bucket holding the percentile, max if above all."""
+        if not self.count:
+            return None
+        rank = percent / 100 * self.count
+        seen = 0
+        for bucket, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bucket, self.max)
+        return self.max
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "max": self.max,
+            "buckets": dict(zip([*self.buckets, "inf"], self.counts)),
+        }
+
+
+@dataclass
+class Nexus21QueueStats:
+    merged: int = 0
+    """Requests that joined an identical queued request."""
+    superseded: int = 0
+    """Queued commands replaced by a newer command."""
+    command_wait: Nexus21Histogram = field(default_factory=Nexus21Histogram)
+    poll_wait: Nexus21Histogram = field(default_factory=Nexus21Histogram)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "merged": self.merged,
+            "superseded": self.superseded,
+            "command_wait": self.command_wait.as_dict(),
+            "poll_wait": self.poll_wait.as_dict(),
+        }
+
+
+class Nexus21ModuleStats:
+    """Request and transition statistics of one IP module."""
+
+    def __init__(self, queue: Nexus21QueueStats) -> None:
+        self.queue = queue
+        self.request_latency = Nexus21Histogram()
+        self.errors = 0
+        self.timeouts = 0
+        self.transition_polls = Nexus21Histogram(NEXUS21_POLL_COUNT_BUCKETS)
+        self.transition_duration: Dict[str, Nexus21Histogram] = {}
+        self.transition_timeouts = 0
+
+    def record_transition(self, report: "Nexus21TransitionReport") -> None:
+        self.transition_polls.record(report.polls)
+        if report.actual is not None:
+            if report.command not in self.transition_duration:
+                self.transition_duration[report.command] = Nexus21Histogram(
+                    NEXUS21_DURATION_BUCKETS
+                )
+            self.transition_duration[report.command].record(report.actual)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "request_latency": self.request_latency.as_dict(),
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "queue": self.queue.as_dict(),
+            "transition_polls": self.transition_polls.as_dict(),
+            "transition_duration": {
+                command: histogram.as_dict()
+                for command, histogram in self.transition_duration.items()
+            },
+            "transition_timeouts": self.transition_timeouts,
+        }
+
+
+class _QueuedRequest:
+    __slots__ = ("key", "factory", "future", "queued_at")
+
+    def __init__(self, key: Optional[str], factory: Callable[[], Awaitable]):
+        self.key = key
+        self.factory = factory
+        self.future = asyncio.get_running_loop().create_future()
+        # Callers may all have been cancelled, don't warn about the result.
+        self.future.add_done_callback(
+            lambda future: future.cancelled() or future.exception()
+        )
+        self.queued_at = time.monotonic()
+
+
+class Nexus21RequestQueue:
+    """Sends requests to an IP module one at a time, commands ahead of polls.
+
+    A queued command is replaced by any newer command, whose caller gets
+    Nexus21CommandSuperseded, or joined by an identical one. Queued polls are
+    merged into one request. A request that has started is always finished.
+    """
+
+    def __init__(self) -> None:
+        self._commands: Deque[_QueuedRequest] = deque()
+        self._polls: Deque[_QueuedRequest] = deque()
+        self._running = False
+        # Kept so that running requests aren't garbage collected.
+        self._tasks: Set[asyncio.Task] = set()
+        self.stats = Nexus21QueueStats()
+
+    @property
+    def depth(self) -> int:
+        """Requests waiting for the IP module."""
+        return len(self._commands) + len(self._polls)
+
+    async def command(self, key: str, factory: Callable[[], Awaitable]) -> Any:
+        for queued in self._commands:
+            if queued.key == key:
+                self.stats.merged += 1
+                return await asyncio.shield(queued.future)
+
+        while self._commands:
+            stale = self._commands.popleft()
+            stale.future.set_exception(Nexus21CommandSuperseded(stale.key, key))
+            self.stats.superseded += 1
+
+        return await self._submit(self._commands, _QueuedRequest(key, factory))
+
+    async def poll(self, factory: Callable[[], Awaitable]) -> Any:
+        if self._polls:
+            self.stats.merged += 1
+            return await asyncio.shield(self._polls[0].future)
+
+        return await self._submit(self._polls, _QueuedRequest(None, factory))
+
+    async def _submit(
+        self, queue: Deque[_QueuedRequest], request: _QueuedRequest
+    ) -> Any:
+        queue.append(request)
+        self._next()
+        return await asyncio.shield(request.future)
+
+    def _next(self) -> None:
+        if self._running or not (self._commands or self._polls):
+            return
+
+        if self._commands:
+            request = self._commands.popleft()
+            self.stats.command_wait.record(time.monotonic() - request.queued_at)
+        else:
+            request = self._polls.popleft()
+            self.stats.poll_wait.record(time.monotonic() - request.queued_at)
+
+        self._running = True
+        task = asyncio.ensure_future(self._run(request))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def aclose(self) -> None:
+        """Cancel the queued requests and the one running."""
+        for queue in (self._commands, self._polls):
+            while queue:
+                queue.popleft().future.cancel()
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks)
+
+    async def _run(self, request: _QueuedRequest) -> None:
+        try:
+            result = await request.factory()
+        except asyncio.CancelledError:
+            request.future.cancel()
+            raise
+        except Exception as error:
+            request.future.set_exception(error)
+        else:
+            request.future.set_result(result)
+        finally:
+            self._running = False
+            self._next()
+
+
+class _RawResponse:
+    __slots__ = ("status", "reason")
+
+    def __init__(self, status: int, reason: str):
+        self.status = status
+        self.reason = reason
+
+    def __repr__(self) -> str:
+        return f"<RawResponse {self.status} {self.reason}>"
+
+
+class _Nexus21RawProtocol(asyncio.Protocol):
+    """One keep-alive connection, one request at a time.
+
+    Responses are read into a single buffer that is reused for every request
+    and bounded by `max_response`.
+    """
+
+    def __init__(self, max_response: int) -> None:
+        self._max_response = max_response
+        self._buffer = bytearray()
+        self._transport: Optional[asyncio.Transport] = None
+        self._waiter: Optional[asyncio.Future] = None
+        self._body_at: Optional[int] = None
+        self._length: Optional[int] = None
+        self._status = 0
+        self._reason = ""
+        self.open = False
+        self.must_close = False
+
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        self._transport = transport
+        self.open = True
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self.open = False
+        if self._body_at is not None and self._length is None:
+            # No Content-Length, the body ends with the connection.
+            self._finish(len(self._buffer))
+        else:
+            self._fail(aiohttp.ServerDisconnectedError())
+
+    def close(self) -> None:
+        self.open = False
+        if self._transport is not None:
+            self._transport.close()
+
+    def exchange(self, request: bytes) -> asyncio.Future:
+        del self._buffer[:]
+        self._body_at = self._length = None
+        self._waiter = asyncio.get_running_loop().create_future()
+        self._transport.write(request)
+        return self._waiter
+
+    def data_received(self, data: bytes) -> None:
+        buffer = self._buffer
+        buffer += data
+        if self._waiter is None or self._waiter.done():
+            return
+        if len(buffer) > self._max_response:
+            self._fail(Nexus21RawUnsupported("response too large"))
+            return
+        if self._body_at is None:
+            end = buffer.find(b"\r\n\r\n")
+            if end < 0:
+                return
+            try:
+                self._parse_head(bytes(buffer[:end]).decode("latin-1"))
+            except (ValueError, Nexus21RawUnsupported) as error:
+                self._fail(Nexus21RawUnsupported(f"unexpected response: {error}"))
+                return
+            self._body_at = end + 4
+        if self._length is not None and len(buffer) >= self._body_at + self._length:
+            self._finish(self._body_at + self._length)
+
+    def _parse_head(self, head: str) -> None:
+        status_line, *header_lines = head.split("\r\n")
+        version, status, *reason = status_line.split(" ", 2)
+        self._status = int(status)
+        self._reason = reason[0] if reason else ""
+        self.must_close = version == "HTTP/1.0"
+        for line in header_lines:
+            name, _, value = line.partition(":")
+            name = name.strip().lower()
+            value = value.strip().lower()
+            if name == "content-length":
+                self._length = int(value)
+            elif name == "transfer-encoding" and value != "identity":
+                raise Nexus21RawUnsupported(f"transfer-encoding {value}")
+            elif name == "connection":
+                self.must_close = value == "close"
+        if self._length is None:
+            self.must_close = True
+
+    def _finish(self, end: int) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(
+                (self._status, self._reason, bytes(self._buffer[self._body_at : end]))
+            )
+
+    def _fail(self, error: Exception) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_exception(error)
+        self.close()
+
+
+class Nexus21RawConnection:
+    """Minimal HTTP/1.1 client for the status and command endpoints.
+
+    The IP module answers both with a few bytes of JSON, so the full aiohttp
+    client is more work than the exchange itself. Requests are encoded once and
+    replies decoded straight from the read buffer. Raises
+    Nexus21RawUnsupported for requests and responses it doesn't handle, the
+    caller should use aiohttp instead.
+    """
+
+    def __init__(
+        self, host: str, max_response: int = NEXUS21_RAW_MAX_RESPONSE
+    ) -> None:
+        self.host = host
+        # IPv6 addresses need brackets, as in a URL: "[fe80::1]:8080".
+        address = urlsplit(f"//{host}")
+        try:
+            self._address = (address.hostname, address.port or 80)
+        except ValueError as error:
+            raise ValueError(f"Invalid host {host!r}: {error}") from error
+        self._max_response = max_response
+        self._status_request = self._encode("GET", NEXUS21_STATUS)
+        self._command_requests: Dict[str, bytes] = {}
+        self._protocol: Optional[_Nexus21RawProtocol] = None
+
+    def _encode(self, method: str, service: str, body: bytes = b"") -> bytes:
+        head = (
+            f"{method} /api/{service} HTTP/1.1\r\n"
+            f"Host: {self.host}\r\n"
+            "Accept: application/json\r\n"
+        )
+        if body:
+            head += (
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+            )
+        return head.encode("latin-1") + b"\r\n" + body
+
+    def _request_bytes(self, method: str, service: str, payload: Any) -> bytes:
+        if method == "GET" and service == NEXUS21_STATUS and payload is None:
+            return self._status_request
+        if (
+            method == "POST"
+            and service == NEXUS21_COMMAND
+            and isinstance(payload, dict)
+            and payload.keys() == {"COMMAND"}
+            and payload["COMMAND"] in NEXUS21_COMMANDS
+        ):
+            command = payload["COMMAND"]
+            request = self._command_requests.get(command)
+            if request is None:
+                request = self._command_requests[command] = self._encode(
+                    method, service, b'{"COMMAND": "%s"}' % command.encode()
+                )
+            return request
+        raise Nexus21RawUnsupported(f"{method} {service}")
+
+    async def request(
+        self, method: str, service: str, payload: Any, timeout: float
+    ) -> Any:
+        request = self._request_bytes(method, service, payload)
+        try:
+            status, reason, body = await asyncio.wait_for(
+                self._exchange(request), timeout
+            )
+        except BaseException:
+            # Whatever was in flight would arrive as the next response.
+            self.close()
+            raise
+        if status != 200:
+            raise Nexus21InvalidResponse(_RawResponse(status, reason))
+        return json_loads(body)
+
+    async def _exchange(self, request: bytes) -> Tuple[int, str, bytes]:
+        protocol = self._protocol
+        if protocol is None or not protocol.open:
+            try:
+                _, protocol = await asyncio.get_running_loop().create_connection(
+                    lambda: _Nexus21RawProtocol(self._max_response), *self._address
+                )
+            except OSError as error:
+                raise aiohttp.ClientConnectionError(
+                    f"Cannot connect to {self.host}: {error}"
+                ) from error
+            self._protocol = protocol
+        response = await protocol.exchange(request)
+        if protocol.must_close:
+            self.close()
+        return response
+
+    def close(self) -> None:
+        if self._protocol is not None:
+            self._protocol.close()
+            self._protocol = None
+
+
+class _Nexus21Watcher:
+    """Statuses waiting for one consumer of Nexus21IPModule.watch()."""
+
+    __slots__ = ("statuses", "ready", "closed", "dropped")
+
+    def __init__(self, buffer: int) -> None:
+        self.statuses: Deque[IPModuleStatusResponse] = deque(maxlen=buffer)
+        self.ready = asyncio.Event()
+        self.closed = False
+        self.dropped = 0
+
+    def push(self, status: IPModuleStatusResponse) -> None:
+        if len(self.statuses) == self.statuses.maxlen:
+            self.dropped += 1
+        self.statuses.append(status)
+        self.ready.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self.ready.set()
+
+    async def get(self) -> Optional[IPModuleStatusResponse]:
+        """Next status, None once the watcher is closed and drained."""
+        while not self.statuses:
+            if self.closed:
+                return None
+            self.ready.clear()
+            await self.ready.wait()
+        return self.statuses.popleft()
+
+
+class _Nexus21Transition:
+    """A command the module's transition task is moving the lift for."""
+
+    __slots__ = (
+        "command",
+        "poll_interval",
+        "began_at",
+        "future",
+        "callbacks",
+        "waiters",
+    )
+
+    def __init__(self, command: Nexus21ServiceCommands, poll_interval: float):
+        self.command = command
+        self.poll_interval = poll_interval
+        self.began_at = time.monotonic()
+        self.future = asyncio.get_running_loop().create_future()
+        # Callers may all have given up, don't warn about the result.
+        self.future.add_done_callback(
+            lambda future: future.cancelled() or future.exception()
+        )
+        self.callbacks: List[Callable[[IPModuleStatusResponse], Awaitable]] = []
+        self.waiters = 0
+
+    async def progress(self, status: IPModuleStatusResponse) -> None:
+        for callback in self.callbacks:
+            await callback(status)
+
+
 class Nexus21IPModule:
 
     host: str
-    _session: aiohttp.ClientSession
-    _status: StatusResponse
+    travel_times: Nexus21TravelTimes
+    last_transition: Optional[Nexus21TransitionReport] = None
+    _session: Optional[aiohttp.ClientSession]
+    _status: Optional[IPModuleStatusResponse] = None
+    _status_at: float = float("-inf")
+    _status_request: Optional[asyncio.Task] = None
+    _transition_task: Optional[asyncio.Task] = None
+    _transition_target: Optional[_Nexus21Transition] = None
+    _watch_task: Optional[asyncio.Task] = None
+    _watched_status: Optional[IPModuleStatusResponse] = None
+    last_command_at = float("-inf")
+    """Monotonic time the last command was accepted."""
 
     def __init__(
         self,
         host,
         session: aiohttp.ClientSession = None,
+        travel_times: Nexus21TravelTimes = None,
+        poll_precision: float = NEXUS21_TRANSITION_POLL_PRECISION,
+        status_ttl: float = NEXUS21_STATUS_TTL,
+        request_limiter: asyncio.Semaphore = None,
+        transport: Callable[[str, str, Any], Awaitable[Any]] = None,
+        raw_http: bool = False,
     ) -> None:
         self.host = host
-        self._session = session or aiohttp.ClientSession()
-        self._service_lock = (
-            asyncio.Lock()
+        self.travel_times = travel_times or Nexus21TravelTimes()
+        self.poll_precision = poll_precision
+        self.status_ttl = status_ttl
+        # Without a session the module opens its own, holding a single keep-alive
+        # connection to the IP module.
+        self._session = session
+        self._owns_session = session is None
+        # Optionally the status and command requests skip aiohttp, which is
+        # still used for anything the raw client doesn't understand.
+        self._raw: Optional[Nexus21RawConnection] = (
+            Nexus21RawConnection(host) if raw_http else None
+        )
+        self._service_queue = (
+            Nexus21RequestQueue()
         )  # IP Module is limited to one HTTP call at a time.
+        # Optionally shared with other modules to cap concurrent HTTP requests.
+        self._request_limiter = request_limiter
+        # Sends (method, service, payload) and returns the decoded body. HTTP by
+        # default, swapped out to record or replay exchanges.
+        self.transport = transport or self._send
+        self.stats = Nexus21ModuleStats(self._service_queue.stats)
+        self.position_estimator = Nexus21PositionEstimator(self.travel_times)
+        self.breaker = Nexus21CircuitBreaker()
+        self.round_trip = Nexus21RoundTripTimer()
+        self._status_listeners: List[Callable[[IPModuleStatusResponse], None]] = []
+        self._command_listeners: List[Callable[[str], None]] = []
+        self._watchers: List[_Nexus21Watcher] = []
+        self._watch_wakeup = asyncio.Event()
+        self._transition_retargeted = asyncio.Event()
+
+    async def __aenter__(self) -> "Nexus21IPModule":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def connect(self) -> None:
+        """Open the connection to the IP module ahead of the first poll."""
+        await self.get_status(max_age=0)
+
+    async def aclose(self) -> None:
+        """Close the module's own session, a session passed in is left open.
+
+        Any watch() iterators end.
+        """
+        if (transition_task := self._transition_task) is not None:
+            transition_task.cancel()
+            await asyncio.wait([transition_task])
+        for watcher in self._watchers:
+            watcher.close()
+        await self._stop_watch_poll()
+        await self._service_queue.aclose()
+        if self._raw is not None:
+            self._raw.close()
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
 
-    async def get_status(self) -> IPModuleStatusResponse:
-        async with self._service_lock:
-            async with self._session.get(
-                f"http://{self.host}/api/{NEXUS21_STATUS}"
-            ) as response:
-                if response.status == 200:
-                    json = await response.json()
-                    return IPModuleStatusResponse(json)
-                else:
-                    raise Nexus21InvalidResponse(response)
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=1, keepalive_timeout=NEXUS21_KEEPALIVE_TIMEOUT
+                )
+            )
+        return self._session
+
+    @property
+    def last_status(self) -> Optional[IPModuleStatusResponse]:
+        """Last status received from the IP module, None before the first one."""
+        return self._status
+
+    @property
+    def in_transition(self) -> bool:
+        """Whether open(), close() or move() is polling the module."""
+        return self._transition_task is not None
+
+    def add_status_listener(
+        self, listener: Callable[[IPModuleStatusResponse], None]
+    ) -> Callable[[], None]:
+        """Call `listener` with every new status, returns a function to stop."""
+        self._status_listeners.append(listener)
+        return lambda: self._status_listeners.remove(listener)
+
+    def add_command_listener(self, listener: Callable[[str], None]) -> Callable[[], None]:
+        """Call `listener` with every command the IP module accepts."""
+        self._command_listeners.append(listener)
+        return lambda: self._command_listeners.remove(listener)
+
+    async def watch(
+        self, buffer: int = NEXUS21_WATCH_BUFFER
+    ) -> AsyncIterator[IPModuleStatusResponse]:
+        """Iterate over the statuses of the IP module as they change.
+
+        Starts with the last known status, if any. Every watcher shares one
+        poller, which runs while there are watchers and takes statuses from
+        transitions and events as well, so watchers add no requests of their
+        own beyond it. A watcher falling more than `buffer` statuses behind
+        loses the oldest ones. The iterator ends when the module is closed;
+        close it (or leave the `async for`) to stop watching.
+        """
+        watcher = _Nexus21Watcher(buffer)
+        if self._watched_status is not None:
+            watcher.push(self._watched_status)
+        self._watchers.append(watcher)
+        if self._watch_task is None:
+            self._watch_task = asyncio.ensure_future(self._watch_poll())
+        try:
+            while (status := await watcher.get()) is not None:
+                yield status
+        finally:
+            self._watchers.remove(watcher)
+            if not self._watchers:
+                await self._stop_watch_poll()
+
+    @property
+    def watchers(self) -> int:
+        return len(self._watchers)
+
+    @property
+    def watch_dropped(self) -> int:
+        """Statuses the current watchers have lost by falling behind."""
+        return sum(watcher.dropped for watcher in self._watchers)
+
+    async def _watch_poll(self) -> None:
+        while True:
+            moving = self.position_estimator.moving or (
+                self._status is not None and self._status.moving
+            )
+            interval = NEXUS21_WATCH_MOVING_INTERVAL if moving else NEXUS21_WATCH_INTERVAL
+            delay = interval
+            # A transition polls the module already.
+            if not self.in_transition:
+                try:
+                    await self.get_status(max_age=interval)
+                    delay = interval - min(self.status_age, interval)
+                except (
+                    Nexus21Error,
+                    aiohttp.ClientError,
+                    asyncio.TimeoutError,
+                    ValueError,
+                    vol.Invalid,
+                ) as error:
+                    _LOGGER.debug("Watching %s failed: %r", self.host, error)
+            # Woken early by a command, to follow the lift from the start.
+            self._watch_wakeup.clear()
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._watch_wakeup.wait(), delay)
+
+    async def _stop_watch_poll(self) -> None:
+        if (watch_task := self._watch_task) is not None:
+            self._watch_task = None
+            watch_task.cancel()
+            await asyncio.wait([watch_task])
+
+    @property
+    def available(self) -> bool:
+        """False while requests fail at once because the module stopped responding."""
+        return self.breaker.closed
+
+    @property
+    def position(self) -> Optional[float]:
+        """Estimated position from 0 (down) to 100 (up), None if unknown."""
+        return self.position_estimator.position()
+
+    @property
+    def status_age(self) -> float:
+        """Seconds since the last status was received, inf if it is stale."""
+        return time.monotonic() - self._status_at
+
+    async def get_status(
+        self, max_age: Optional[float] = None, cached_only: bool = False
+    ) -> Optional[IPModuleStatusResponse]:
+        """Return a status no older than `max_age` seconds.
+
+        `max_age` defaults to the module's `status_ttl`, 0 always asks the IP
+        module. Concurrent callers share a single request. With `cached_only`
+        the last known status is returned without contacting the IP module.
+        """
+        if cached_only:
+            return self._status
+
+        if max_age is None:
+            max_age = self.status_ttl
+        if self._status is not None and self.status_age <= max_age:
+            return self._status
+
+        if self._status_request is None:
+            self._status_request = asyncio.ensure_future(self._fetch_status())
+            self._status_request.add_done_callback(self._status_request_done)
+
+        return await asyncio.shield(self._status_request)
+
+    def _status_request_done(self, request: asyncio.Task) -> None:
+        if self._status_request is request:
+            self._status_request = None
+        if not request.cancelled():
+            # Callers may all have been cancelled, don't warn about it.
+            request.exception()
+
+    async def _fetch_status(self) -> IPModuleStatusResponse:
+        return await self._service_queue.poll(self._request_status)
+
+    async def _request_status(self) -> IPModuleStatusResponse:
+        status = IPModuleStatusResponse(await self._request("GET", NEXUS21_STATUS))
+        self.update_status(status)
+        return status
+
+    def update_status(self, status: IPModuleStatusResponse) -> None:
+        """Take a status received other than by polling, e.g. from an event."""
+        self._status = status
+        self._status_at = time.monotonic()
+        self.position_estimator.correct(status)
+        for listener in list(self._status_listeners):
+            listener(status)
+        if status != self._watched_status:
+            self._watched_status = status
+            for watcher in self._watchers:
+                watcher.push(status)
 
     async def post_command(self, command: Nexus21ServiceCommands) -> IPModuleResponse:
+        """Send a command, ahead of any queued status polls.
+
+        Raises Nexus21CommandSuperseded if another command is posted while this
+        one is still queued.
+        """
         if command not in NEXUS21_COMMANDS:
             raise Nexus21InvalidCommandError(command)
 
-        async with self._service_lock:
-            async with self._session.post(
-                f"http://{self.host}/api/{NEXUS21_COMMAND}",
-                json={"COMMAND": command},
-            ) as http_response:
-                if http_response.status == 200:
-                    module_response = IPModuleResponse(await http_response.json())
-                    if module_response.not_ok:
-                        raise Nexus21CommandFailed(command, module_response)
-                    else:
-                        return module_response
-                else:
-                    raise Nexus21InvalidResponse(http_response)
+        return await self._service_queue.command(
+            command, lambda: self._request_command(command)
+        )
+
+    async def _request_command(
+        self, command: Nexus21ServiceCommands
+    ) -> IPModuleResponse:
+        module_response = IPModuleResponse(
+            await self._request("POST", NEXUS21_COMMAND, {"COMMAND": command})
+        )
+        if module_response.not_ok:
+            raise Nexus21CommandFailed(command, module_response)
+        else:
+            # The lift is about to move, the cached status is stale.
+            self._status_at = float("-inf")
+            self.last_command_at = time.monotonic()
+            self.position_estimator.start(command)
+            for listener in list(self._command_listeners):
+                listener(command)
+            self._watch_wakeup.set()
+            return module_response
+
+    @property
+    def request_timeout(self) -> float:
+        """Seconds the next HTTP request may take, see Nexus21RoundTripTimer."""
+        return self.round_trip.timeout
+
+    def transition_timeout(self, command: Nexus21ServiceCommands) -> float:
+        """Seconds a transition for `command` may take from here."""
+        expected = self.position_estimator.expected_travel(command)
+        if expected is None:
+            return NEXUS21_TRANSITION_TIMEOUT
+        # The first and last polls may each wait out a request timeout.
+        return (
+            expected * NEXUS21_TRANSITION_TIMEOUT_FACTOR
+            + NEXUS21_TRANSITION_TIMEOUT_MARGIN
+            + 2 * self.request_timeout
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        return self._service_queue.depth
+
+    @property
+    def queue_stats(self) -> Nexus21QueueStats:
+        return self._service_queue.stats
+
+    def _limited(self):
+        return self._request_limiter or contextlib.nullcontext()
+
+    async def _request(self, method: str, service: str, payload: Any = None) -> Any:
+        """Send a request to the IP module and return the decoded JSON body.
+
+        Must only be called through `_service_queue`. Raises
+        Nexus21ModuleUnavailable without sending while the breaker is open.
+        """
+        if not self.breaker.allow():
+            raise Nexus21ModuleUnavailable(self.host, self.breaker.retry_in)
+
+        try:
+            body = await self.transport(method, service, payload)
+        except (Nexus21Error, aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            self.breaker.failure()
+            raise
+        except BaseException:
+            self.breaker.abandon()
+            raise
+        self.breaker.success()
+        return body
+
+    async def _send(self, method: str, service: str, payload: Any) -> Any:
+        stats = self.stats
+        began_at = time.monotonic()
+        for attempt in range(2):
+            try:
+                async with self._limited():
+                    sent_at = time.monotonic()
+                    body = await self._exchange(method, service, payload)
+                answered_at = time.monotonic()
+                self.round_trip.sample(answered_at - sent_at)
+                stats.request_latency.record(answered_at - began_at)
+                return body
+            except (aiohttp.ServerDisconnectedError, aiohttp.ClientOSError) as error:
+                # The IP module dropped the idle keep-alive connection, the
+                # request never reached it so reconnect and send it again.
+                if attempt or isinstance(error, aiohttp.ClientConnectorError):
+                    stats.errors += 1
+                    raise
+                _LOGGER.debug("%s reset the connection, reconnecting", self.host)
+            except asyncio.TimeoutError:
+                stats.timeouts += 1
+                self.round_trip.timed_out()
+                raise
+            except Exception:
+                stats.errors += 1
+                raise
+
+    async def _exchange(self, method: str, service: str, payload: Any) -> Any:
+        if self._raw is not None:
+            try:
+                return await self._raw.request(
+                    method, service, payload, self.request_timeout
+                )
+            except Nexus21RawUnsupported as error:
+                _LOGGER.debug("%s: %s, using aiohttp instead", self.host, error)
+                self._raw.close()
+                self._raw = None
+
+        async with self._get_session().request(
+            method,
+            f"http://{self.host}/api/{service}",
+            json=payload,
+            timeout=aiohttp.ClientTimeout(total=self.request_timeout),
+        ) as response:
+            if response.status != 200:
+                raise Nexus21InvalidResponse(response)
+            return await response.json(loads=json_loads)
 
     async def close(
         self,
         async_progress_callback: Callable[
             [IPModuleStatusResponse, bool], Awaitable
         ] = None,
-        timeout=NEXUS21_TRANSITION_TIMEOUT,
+        timeout: float = None,
         poll_interval=NEXUS21_TRANSITION_POLL_INTERVAL,
     ) -> float:
-        async def async_transition_callback(status: IPModuleStatusResponse):
-            if status.moving and async_progress_callback:
-                await async_progress_callback(status, False)
-            elif status.not_moving and status.down and async_progress_callback:
-                await async_progress_callback(status, True)
-
-        return await asyncio.wait_for(
-            self._transition(
-                command=Nexus21Command.DOWN.name,
-                async_transition_callback=async_transition_callback,
-                poll_interval=poll_interval,
-            ),
-            timeout=timeout,
+        return await self.move(
+            Nexus21Command.DOWN.name, async_progress_callback, timeout, poll_interval
         )
 
     async def open(
@@ -245,61 +1510,534 @@ class Nexus21IPModule:
         async_progress_callback: Callable[
             [IPModuleStatusResponse, bool], Awaitable
         ] = None,
-        timeout=NEXUS21_TRANSITION_TIMEOUT,
+        timeout: float = None,
         poll_interval=NEXUS21_TRANSITION_POLL_INTERVAL,
     ) -> float:
-        async def async_transition_callback(status: IPModuleStatusResponse):
-            if status.moving and async_progress_callback:
-                await async_progress_callback(status, False)
-            elif status.not_moving and status.up and async_progress_callback:
-                await async_progress_callback(status, True)
-
-        return await asyncio.wait_for(
-            self._transition(
-                command=Nexus21Command.UP.name,
-                async_transition_callback=async_transition_callback,
-                poll_interval=poll_interval,
-            ),
-            timeout=timeout,
+        return await self.move(
+            Nexus21Command.UP.name, async_progress_callback, timeout, poll_interval
         )
 
-    async def _transition(
+    async def move(
         self,
         command: Nexus21ServiceCommands,
-        async_transition_callback: Callable[[IPModuleStatusResponse], Awaitable],
-        poll_interval: int,
+        async_progress_callback: Callable[
+            [IPModuleStatusResponse, bool], Awaitable
+        ] = None,
+        timeout: float = None,
+        poll_interval=NEXUS21_TRANSITION_POLL_INTERVAL,
     ) -> float:
-        began_at = time.time()
-        starting_status = await self.get_status()
-        previous_status = starting_status
+        """Send `command` and wait for the lift to stop moving.
+
+        The module follows one transition at a time. Calling move() with the
+        command that is already underway joins it, another command retargets
+        it and the callers waiting for the old command get
+        Nexus21TransitionSuperseded. Polling stops once nobody is waiting.
+        `timeout` defaults to transition_timeout(command).
+        """
+        if command not in NEXUS21_COMMANDS:
+            raise Nexus21InvalidCommandError(command)
+        if timeout is None:
+            timeout = self.transition_timeout(command)
+
+        transition = self._transition_target
+        if transition is None or transition.command != command:
+            transition = _Nexus21Transition(command, poll_interval)
+            previous, self._transition_target = self._transition_target, transition
+            if previous is not None:
+                previous.future.set_exception(
+                    Nexus21TransitionSuperseded(previous.command, command)
+                )
+                self._transition_retargeted.set()
+            if self._transition_task is None:
+                self._transition_task = asyncio.ensure_future(self._transition())
+
+        if async_progress_callback:
+
+            async def async_transition_callback(status: IPModuleStatusResponse):
+                if status.moving:
+                    await async_progress_callback(status, False)
+                elif command == Nexus21Command.UP.name and status.up:
+                    await async_progress_callback(status, True)
+                elif command == Nexus21Command.DOWN.name and status.down:
+                    await async_progress_callback(status, True)
+                elif command in NEXUS21_MEMORY_COMMANDS:
+                    await async_progress_callback(status, True)
+
+            transition.callbacks.append(async_transition_callback)
+
+        transition.waiters += 1
+        try:
+            return await asyncio.wait_for(
+                asyncio.shield(transition.future), timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            self.stats.transition_timeouts += 1
+            raise
+        finally:
+            transition.waiters -= 1
+            if not transition.waiters and transition is self._transition_target:
+                # Nobody is waiting for the lift anymore.
+                self.cancel_transition()
+
+    def cancel_transition(self) -> None:
+        """Stop following the current transition, its callers are cancelled.
+
+        The lift itself carries on, the IP module has no stop command.
+        """
+        if self._transition_task is not None:
+            self._transition_task.cancel()
+
+    async def _transition(self) -> None:
+        status = None
+        try:
+            while 1:
+                transition = self._transition_target
+                self._transition_retargeted.clear()
+                try:
+                    if status is None:
+                        # The state the lift starts from, a status from within
+                        # status_ttl saves a round trip before the command.
+                        status = await self.get_status()
+                    status = await self._follow(transition, status)
+                except Exception as error:
+                    # Only the transition that failed, not one that replaced it.
+                    if not transition.future.done():
+                        transition.future.set_exception(error)
+                    status = None
+                if transition is self._transition_target:
+                    break
+                # Retargeted while moving, carry on from the latest status.
+        finally:
+            transition, self._transition_target = self._transition_target, None
+            self._transition_task = None
+            if not transition.future.done():
+                transition.future.cancel()
+
+    async def _follow(
+        self,
+        transition: _Nexus21Transition,
+        previous_status: IPModuleStatusResponse,
+    ) -> IPModuleStatusResponse:
+        """Send the transition's command and poll until the lift stops.
+
+        Returns early with the latest status if the transition is retargeted.
+        """
+        command = transition.command
+        origin = self.position
+        expected = self.position_estimator.expected_travel(command)
 
         await self.post_command(command)
 
+        commanded_at = time.monotonic()
+        schedule = Nexus21PollSchedule(
+            expected,
+            poll_interval=transition.poll_interval,
+            precision=self.poll_precision,
+        )
+        previous_poll_at = commanded_at
+        # A retargeted transition starts out moving.
+        moved = previous_status.moving
+        polls = 0
+
         while 1:
-            current_status = await self.get_status()
+            if self._transition_retargeted.is_set():
+                return previous_status
+
+            try:
+                current_status = await self.get_status(max_age=0)
+            except asyncio.TimeoutError:
+                # A missed sample, the lift carries on regardless. Polling goes
+                # on until the deadline of the move.
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(
+                        self._transition_retargeted.wait(),
+                        schedule.next_delay(time.monotonic() - commanded_at),
+                    )
+                continue
+            polled_at = time.monotonic()
+            polls += 1
 
-            if previous_status.not_moving and current_status.not_moving:
+            if current_status.not_ok:
+                raise Nexus21CommandFailed(command, current_status)
+            elif previous_status.not_moving and current_status.not_moving:
                 # This probably means the lift is already in the proper position
-                await async_transition_callback(current_status)
                 break
             elif previous_status.not_moving and current_status.moving:
                 # The lift started moving
-                await async_transition_callback(current_status)
+                moved = True
+                await transition.progress(current_status)
+                if self._transition_retargeted.is_set():
+                    return current_status
             elif previous_status.moving and current_status.not_moving:
                 # The lift finished moving
-                await async_transition_callback(current_status)
                 break
             elif previous_status.moving and current_status.moving:
                 # No need to do anything
                 pass
-            elif current_status.not_ok:
-                raise Nexus21CommandFailed(current_status)
             else:
                 # If reached, some state is not accounted for and needs followup.
                 raise AssertionError
 
             previous_status = current_status
+            previous_poll_at = polled_at
+
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(
+                    self._transition_retargeted.wait(),
+                    schedule.next_delay(polled_at - commanded_at),
+                )
+
+        if self._transition_retargeted.is_set():
+            return current_status
+        actual = None
+        if moved:
+            # The lift stopped somewhere between the last two polls.
+            actual = (previous_poll_at + polled_at) / 2 - commanded_at
+            # Only a full travel from the other end tells the travel time.
+            if (command, origin) in (
+                (Nexus21Command.UP.name, 0),
+                (Nexus21Command.DOWN.name, 100),
+                (Nexus21Command.UP.name, None),
+                (Nexus21Command.DOWN.name, None),
+            ):
+                self.travel_times.learn(command, actual)
 
-            await asyncio.sleep(poll_interval)
+        self.last_transition = Nexus21TransitionReport(
+            command=command,
+            expected=schedule.expected,
+            actual=actual,
+            detected=polled_at - commanded_at,
+            polls=polls,
+        )
+        self.stats.record_transition(self.last_transition)
+        _LOGGER.debug(
+            "%s finished %s: expected %s s, actual %s s, detected after %.2f s in %d polls",
+            self.host,
+            command,
+            "%.2f" % schedule.expected if schedule.expected is not None else "?",
+            "%.2f" % actual if actual is not None else "?",
+            self.last_transition.detected,
+            polls,
+        )
+
+        await transition.progress(current_status)
+        if self._transition_retargeted.is_set() or transition.future.done():
+            # Retargeted during the callbacks, the lift is off again.
+            return current_status
+        transition.future.set_result(time.monotonic() - transition.began_at)
+        return current_status
+
+
+class Nexus21ModuleRegistry:
+    """One Nexus21IPModule per host, shared by everything that talks to it.
+
+    An IP module only handles one request at a time, so the config flow, the
+    config entry, fleets and probes must all go through the same module to have
+    their requests queued rather than collide at the device. Modules are
+    reference counted and closed once the last user has released them.
+    """
+
+    def __init__(self) -> None:
+        self._modules: Dict[str, Nexus21IPModule] = {}
+        self._references: Dict[str, int] = {}
+
+    def __contains__(self, host: str) -> bool:
+        return host in self._modules
+
+    def get(self, host: str) -> Optional[Nexus21IPModule]:
+        """The module for `host` if anyone holds one, without taking a reference."""
+        return self._modules.get(host)
+
+    def acquire(self, host: str, **kwargs) -> Nexus21IPModule:
+        """Module for `host`, `kwargs` are only used if a new one is created."""
+        module = self._modules.get(host)
+        if module is None:
+            module = self._modules[host] = Nexus21IPModule(host, **kwargs)
+            self._references[host] = 0
+        self._references[host] += 1
+        return module
+
+    async def release(self, module: Nexus21IPModule) -> None:
+        host = module.host
+        if self._modules.get(host) is not module:
+            # Not from this registry, the caller owns it.
+            await module.aclose()
+            return
+
+        self._references[host] -= 1
+        if self._references[host] == 0:
+            del self._modules[host], self._references[host]
+            await module.aclose()
+
+    @contextlib.asynccontextmanager
+    async def module(self, host: str, **kwargs) -> AsyncIterator[Nexus21IPModule]:
+        module = self.acquire(host, **kwargs)
+        try:
+            yield module
+        finally:
+            await self.release(module)
+
+
+registry = Nexus21ModuleRegistry()
+"""Registry shared by the whole process."""
+
+
+@dataclass
+class Nexus21FleetResult:
+    host: str
+    result: Any = None
+    """Return value of the operation on this host."""
+    error: Optional[BaseException] = None
+    elapsed: float = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
 
-        return time.time() - began_at
+
+class Nexus21Fleet:
+    """Group control over many IP modules.
+
+    Group operations return async iterators that yield a Nexus21FleetResult per
+    host as soon as that host is done. Operations on the same host run one after
+    another, and at most `max_concurrency` HTTP requests are in flight across the
+    whole fleet. A failing host only fails its own result, and a host that takes
+    longer than `host_timeout` fails with asyncio.TimeoutError.
+
+    Modules come from `registry`, so a host that is already in use elsewhere in
+    the process keeps its own session and isn't subject to `max_concurrency`.
+    """
+
+    modules: Dict[str, Nexus21IPModule]
+
+    def __init__(
+        self,
+        hosts: Iterable[str] = (),
+        session: aiohttp.ClientSession = None,
+        max_concurrency: int = NEXUS21_FLEET_MAX_CONCURRENCY,
+        host_timeout: float = None,
+        registry: Nexus21ModuleRegistry = registry,
+        raw_http: bool = False,
+    ) -> None:
+        # Without a session every module keeps its own connection to its host.
+        self._session = session
+        self.host_timeout = host_timeout
+        self._registry = registry
+        self._raw_http = raw_http
+        self._request_limiter = asyncio.Semaphore(max_concurrency)
+        self._host_locks: Dict[str, asyncio.Lock] = {}
+        self.modules = {}
+        for host in hosts:
+            self.add(host)
+
+    def add(self, host: str) -> Nexus21IPModule:
+        if host not in self.modules:
+            self.modules[host] = self._registry.acquire(
+                host,
+                session=self._session,
+                request_limiter=self._request_limiter,
+                raw_http=self._raw_http,
+            )
+            self._host_locks[host] = asyncio.Lock()
+        return self.modules[host]
+
+    async def remove(self, host: str) -> None:
+        self._host_locks.pop(host)
+        await self._registry.release(self.modules.pop(host))
+
+    async def aclose(self) -> None:
+        modules, self.modules = self.modules, {}
+        self._host_locks.clear()
+        await asyncio.gather(
+            *(self._registry.release(module) for module in modules.values())
+        )
+
+    async def __aenter__(self) -> "Nexus21Fleet":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    def status(
+        self,
+        hosts: Iterable[str] = None,
+        deadline: float = None,
+        max_age: float = None,
+    ) -> AsyncIterator[Nexus21FleetResult]:
+        return self._run(
+            hosts, lambda module: module.get_status(max_age=max_age), deadline
+        )
+
+    def command(
+        self,
+        command: Nexus21ServiceCommands,
+        hosts: Iterable[str] = None,
+        deadline: float = None,
+    ) -> AsyncIterator[Nexus21FleetResult]:
+        return self._run(hosts, lambda module: module.post_command(command), deadline)
+
+    def open(
+        self, hosts: Iterable[str] = None, deadline: float = None, **kwargs
+    ) -> AsyncIterator[Nexus21FleetResult]:
+        return self._run(hosts, lambda module: module.open(**kwargs), deadline)
+
+    def close(
+        self, hosts: Iterable[str] = None, deadline: float = None, **kwargs
+    ) -> AsyncIterator[Nexus21FleetResult]:
+        return self._run(hosts, lambda module: module.close(**kwargs), deadline)
+
+    async def _run(
+        self,
+        hosts: Optional[Iterable[str]],
+        operation: Callable[[Nexus21IPModule], Awaitable],
+        deadline: Optional[float],
+    ) -> AsyncIterator[Nexus21FleetResult]:
+        began_at = time.monotonic()
+        tasks = {
+            asyncio.ensure_future(self._run_one(host, operation)): host
+            for host in (self.modules if hosts is None else hosts)
+        }
+        pending = set(tasks)
+        try:
+            while pending:
+                timeout = None
+                if deadline is not None:
+                    timeout = max(deadline - (time.monotonic() - began_at), 0)
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break
+                for task in done:
+                    yield task.result()
+
+            # Whatever is left missed the deadline.
+            for task in pending:
+                task.cancel()
+                yield Nexus21FleetResult(
+                    host=tasks[task],
+                    error=asyncio.TimeoutError(),
+                    elapsed=time.monotonic() - began_at,
+                )
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.wait(pending)
+
+    async def _run_one(
+        self, host: str, operation: Callable[[Nexus21IPModule], Awaitable]
+    ) -> Nexus21FleetResult:
+        began_at = time.monotonic()
+        try:
+            async with self._host_locks[host]:
+                result = await asyncio.wait_for(
+                    operation(self.modules[host]), self.host_timeout
+                )
+        except Exception as error:
+            _LOGGER.debug("%s failed: %r", host, error)
+            return Nexus21FleetResult(
+                host=host, error=error, elapsed=time.monotonic() - began_at
+            )
+        return Nexus21FleetResult(
+            host=host, result=result, elapsed=time.monotonic() - began_at
+        )
+
+
+@dataclass
+class Nexus21ProbeResult:
+    host: str
+    status: IPModuleStatusResponse
+    rtt: float
+
+
+async def probe(
+    host: str,
+    session: aiohttp.ClientSession = None,
+    timeout: float = NEXUS21_PROBE_TIMEOUT,
+) -> Optional[Nexus21ProbeResult]:
+    """Return the status of the IP module at `host`, None if there is none.
+
+    A host that is in use elsewhere in the process is asked through its shared
+    module, so the probe waits its turn instead of colliding with other requests.
+    """
+    module = registry.get(host)
+    if module is not None:
+        began_at = time.monotonic()
+        try:
+            status = await asyncio.wait_for(module.get_status(), timeout)
+        except (
+            Nexus21Error,
+            aiohttp.ClientError,
+            asyncio.TimeoutError,
+            ValueError,
+            vol.Invalid,
+        ):
+            return None
+        return Nexus21ProbeResult(host, status, time.monotonic() - began_at)
+
+    if session is None:
+        async with aiohttp.ClientSession() as session:
+            return await probe(host, session, timeout)
+
+    began_at = time.monotonic()
+    try:
+        async with session.get(
+            f"http://{host}/api/{NEXUS21_STATUS}",
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        ) as response:
+            if response.status != 200:
+                return None
+            status = IPModuleStatusResponse(await response.json(loads=json_loads))
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, vol.Invalid):
+        return None
+    return Nexus21ProbeResult(host, status, time.monotonic() - began_at)
+
+
+async def scan(
+    network: str,
+    concurrency: int = NEXUS21_PROBE_CONCURRENCY,
+    timeout: float = NEXUS21_PROBE_TIMEOUT,
+    port: int = None,
+) -> AsyncIterator[Nexus21ProbeResult]:
+    """Probe every host of `network`, e.g. "192.168.0.0/24", for IP modules.
+
+    IP modules are yielded as they answer. Once one has answered, the probe
+    timeout adapts to how quickly modules on this network respond.
+    """
+    hosts = iter(ipaddress.ip_network(network, strict=False).hosts())
+    found: asyncio.Queue = asyncio.Queue()
+    slowest = 0.0
+
+    async def probe_hosts(session: aiohttp.ClientSession) -> None:
+        nonlocal slowest
+        for host in hosts:
+            probe_timeout = timeout
+            if slowest:
+                probe_timeout = min(
+                    max(
+                        slowest * NEXUS21_PROBE_TIMEOUT_FACTOR,
+                        NEXUS21_PROBE_MIN_TIMEOUT,
+                    ),
+                    timeout,
+                )
+            address = f"{host}:{port}" if port else str(host)
+            result = await probe(address, session, probe_timeout)
+            if result is not None:
+                slowest = max(slowest, result.rtt)
+                found.put_nowait(result)
+
+    async with aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=concurrency, force_close=True)
+    ) as session:
+        workers = asyncio.gather(
+            *(probe_hosts(session) for _ in range(concurrency))
+        )
+        workers.add_done_callback(lambda _: found.put_nowait(None))
+        try:
+            while (result := await found.get()) is not None:
+                yield result
+        finally:
+            if not workers.done():
+                workers.cancel()
+                await asyncio.wait([workers])
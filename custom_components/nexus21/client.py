@@ -1,26 +1,184 @@
 #!/usr/bin/env python3
+"""Command line control of many Nexus21 IP modules at once.
 
-import aiohttp
+Results are written to stdout as one JSON object per line, in the order the
+hosts finish:
+
+    client.py status 192.168.0.39 192.168.0.40
+    client.py --inventory lifts.txt --concurrency 64 close
+    client.py --inventory lifts.txt command MEM1
+    client.py --inventory lifts.txt watch --interval 5
+
+An inventory file has one host per line, optionally followed by a name.
+Blank lines and lines starting with # are ignored, "-" reads from stdin.
+"""
+
+import argparse
 import asyncio
+import json
+import sys
+import time
+from typing import Any, Dict, Iterable, List, Optional, TextIO, Tuple
+
+from api import (
+    NEXUS21_COMMANDS,
+    NEXUS21_FLEET_MAX_CONCURRENCY,
+    IPModuleResponse,
+    IPModuleStatusResponse,
+    Nexus21Fleet,
+    Nexus21FleetResult,
+)
+
+# Seconds one host gets for an action unless --timeout is given.
+DEFAULT_TIMEOUTS = {"status": 10, "command": 10, "open": 60, "close": 60, "watch": 10}
+
+
+def read_inventory(lines: Iterable[str]) -> List[Tuple[str, Optional[str]]]:
+    hosts = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        host, _, name = line.partition(" ")
+        hosts.append((host, name.strip() or None))
+    return hosts
+
+
+def response_as_dict(response: Any) -> Any:
+    if isinstance(response, IPModuleStatusResponse):
+        return {
+            "status": response.status,
+            "vertical": response.vertical.value,
+            "horizontal": response.horizontal.value,
+            "moving": response.moving,
+            "description": response.description,
+        }
+    if isinstance(response, IPModuleResponse):
+        return {"status": response.status, "description": response.description}
+    return response
+
+
+def result_as_dict(
+    action: str, result: Nexus21FleetResult, name: Optional[str]
+) -> Dict[str, Any]:
+    line = {"host": result.host, "action": action}
+    if name is not None:
+        line["name"] = name
+    line["ok"] = result.ok
+    line["elapsed"] = round(result.elapsed, 3)
+    if result.ok:
+        line["result"] = response_as_dict(result.result)
+    else:
+        line["error"] = type(result.error).__name__
+        if str(result.error):
+            line["error"] += f": {result.error}"
+    return line
+
 
-from api import Nexus21IPModule
+def emit(line: Dict[str, Any], out: TextIO) -> None:
+    out.write(json.dumps(line) + "\n")
+    out.flush()
 
 
-async def fetch(client):
-    upper = Nexus21IPModule("192.168.0.39", session=client)
-    lower = Nexus21IPModule("192.168.0.40", session=client)
-    return await asyncio.gather(
-        upper.close(),
-        lower.close(),
+async def run(args: argparse.Namespace, hosts: Dict[str, Optional[str]]) -> int:
+    timeout = args.timeout or DEFAULT_TIMEOUTS[args.action]
+    failed = 0
+    async with Nexus21Fleet(
+        hosts,
+        max_concurrency=args.concurrency,
+        host_timeout=timeout,
+        raw_http=args.raw_http,
+    ) as fleet:
+        if args.action == "watch":
+            return await watch(fleet, hosts, args.interval)
+
+        if args.action == "status":
+            results = fleet.status(max_age=0)
+        elif args.action == "command":
+            results = fleet.command(args.command)
+        elif args.action == "open":
+            results = fleet.open()
+        else:
+            results = fleet.close()
+
+        async for result in results:
+            failed += not result.ok
+            emit(result_as_dict(args.action, result, hosts[result.host]), sys.stdout)
+    return 1 if failed else 0
+
+
+async def watch(
+    fleet: Nexus21Fleet, hosts: Dict[str, Optional[str]], interval: float
+) -> int:
+    """Poll every host each `interval` seconds and emit a line when it changes.
+
+    Not built on Nexus21IPModule.watch(), which polls at its own interval and
+    only logs failed polls, where a host starting to fail is a line here.
+    """
+    last: Dict[str, Any] = {}
+    while True:
+        began_at = time.monotonic()
+        async for result in fleet.status(max_age=0):
+            line = result_as_dict("watch", result, hosts[result.host])
+            # Errors compare by type, their messages carry retry countdowns.
+            state = line["result"] if result.ok else type(result.error).__name__
+            if last.get(result.host, ...) != state:
+                last[result.host] = state
+                line["time"] = round(time.time(), 3)
+                emit(line, sys.stdout)
+        await asyncio.sleep(max(interval - (time.monotonic() - began_at), 0))
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "-i",
+        "--inventory",
+        type=argparse.FileType("r"),
+        help="file with one host per line, - for stdin",
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=NEXUS21_FLEET_MAX_CONCURRENCY,
+        help="requests in flight across all hosts (default %(default)s)",
+    )
+    parser.add_argument(
+        "-t", "--timeout", type=float, help="seconds each host gets for the action"
+    )
+    parser.add_argument(
+        "--raw-http",
+        action="store_true",
+        help="talk to the modules without aiohttp where possible",
+    )
+    actions = parser.add_subparsers(dest="action", required=True)
+    for action in ("status", "open", "close"):
+        actions.add_parser(action).add_argument("hosts", nargs="*")
+    command = actions.add_parser("command")
+    command.add_argument("command", choices=sorted(NEXUS21_COMMANDS))
+    command.add_argument("hosts", nargs="*")
+    watch_parser = actions.add_parser("watch")
+    watch_parser.add_argument("hosts", nargs="*")
+    watch_parser.add_argument(
+        "--interval", type=float, default=5, help="seconds between polls"
     )
+    args = parser.parse_args(argv)
 
+    inventory = [(host, None) for host in args.hosts]
+    if args.inventory is not None:
+        inventory += read_inventory(args.inventory)
+    if not inventory:
+        parser.error("no hosts given")
+    hosts = dict(inventory)
 
-async def main():
-    async with aiohttp.ClientSession() as client:
-        responses = await fetch(client)
-        #for r in responses:
-        #    print(r.status)
+    try:
+        return asyncio.run(run(args, hosts))
+    except KeyboardInterrupt:
+        return 130
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    sys.exit(main())
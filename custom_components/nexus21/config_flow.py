@@ -1,5 +1,9 @@
 """Config flow for nexus21."""
 from __future__ import annotations
+import aiohttp
+import asyncio
+import ipaddress
+import logging
 from typing import Any
 import voluptuous as vol
 from urllib.parse import urlparse
@@ -7,14 +11,24 @@ from urllib.parse import urlparse
 from homeassistant import config_entries
 from homeassistant.components import ssdp
 from homeassistant.components.dhcp import DhcpServiceInfo
+from homeassistant.components.network import async_get_source_ip
+from homeassistant.core import callback
 from homeassistant.helpers import config_validation as cv
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.const import CONF_IP_ADDRESS, CONF_MAC, CONF_NAME
 from homeassistant.helpers.device_registry import format_mac
 from homeassistant.util.network import is_link_local, is_ip_address, is_host_valid
 
-from .const import DOMAIN
+from .api import (
+    NEXUS21_PROBE_TIMEOUT,
+    Nexus21Error,
+    Nexus21ProbeResult,
+    registry,
+    scan,
+)
+from .const import DOMAIN, CONF_NETWORK
 
+_LOGGER = logging.getLogger(__name__)
 
 USER_SCHEMA = vol.Schema(
     {
@@ -31,13 +45,109 @@ class Nexus21ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     VERSION = 1
 
     _discovery_info: DhcpServiceInfo | None
+    _scan_task: asyncio.Task | None = None
+
+    def __init__(self) -> None:
+        """Initialize the flow."""
+        self._candidates: dict[str, Nexus21ProbeResult] = {}
 
     async def async_step_user(self, user_input=None):
         """Handle the initial step."""
+        return self.async_show_menu(step_id="user", menu_options=["scan", "manual"])
+
+    async def async_step_scan(self, user_input=None):
+        """Search a network for IP modules.
+
+        The candidates are offered once the whole network has been searched,
+        a progress step can't show them as they are found.
+        """
+        if self._scan_task is None:
+            errors = {}
+            if user_input is not None:
+                try:
+                    network = ipaddress.ip_network(
+                        user_input[CONF_NETWORK], strict=False
+                    )
+                except ValueError:
+                    errors[CONF_NETWORK] = "invalid_network"
+                else:
+                    self._scan_task = self.hass.async_create_task(
+                        self._async_scan(str(network))
+                    )
+                    self._scan_task.add_done_callback(self._async_scan_done)
+                    return self.async_show_progress(
+                        step_id="scan", progress_action="scan"
+                    )
+
+            if user_input is not None:
+                default = user_input[CONF_NETWORK]
+            else:
+                default = f"{await async_get_source_ip(self.hass)}/24"
+            return self.async_show_form(
+                step_id="scan",
+                data_schema=vol.Schema(
+                    {vol.Required(CONF_NETWORK, default=default): cv.string}
+                ),
+                errors=errors,
+            )
+
+        if not self._scan_task.done():
+            # Configured by anything else before the search has finished.
+            return self.async_show_progress(step_id="scan", progress_action="scan")
+        if not self._candidates:
+            return self.async_show_progress_done(next_step_id="not_found")
+        return self.async_show_progress_done(next_step_id="pick")
+
+    async def _async_scan(self, network: str) -> None:
+        try:
+            async for result in scan(network):
+                _LOGGER.debug("Found IP module at %s", result.host)
+                self._candidates[result.host] = result
+        except ValueError as error:
+            _LOGGER.warning("Can't search %s: %s", network, error)
+
+    @callback
+    def _async_scan_done(self, task: asyncio.Task) -> None:
+        # Cancelled along with the flow, there is nothing left to move on.
+        if not task.cancelled():
+            self.hass.async_create_task(
+                self.hass.config_entries.flow.async_configure(flow_id=self.flow_id)
+            )
+
+    @callback
+    def async_remove(self) -> None:
+        """Stop searching when the flow is closed."""
+        if self._scan_task is not None:
+            self._scan_task.cancel()
+
+    async def async_step_not_found(self, user_input=None):
+        """Handle a search that found nothing."""
+        return self.async_abort(reason="no_devices_found")
+
+    async def async_step_pick(self, user_input=None):
+        """Pick one of the IP modules found."""
+        if user_input is not None:
+            return await self.async_step_manual(user_input)
+
+        return self.async_show_form(
+            step_id="pick",
+            data_schema=USER_SCHEMA.extend(
+                {vol.Required(CONF_IP_ADDRESS): vol.In(sorted(self._candidates))}
+            ),
+        )
+
+    async def async_step_manual(self, user_input=None):
+        """Handle an IP module entered by hand."""
         errors = {}
         if user_input is not None:
-            # TODO: validate ip address or hostname with is_host_valid, mac address is valid format.
-            errors = []  # await self._async_validate_input(user_input[CONF_IP_ADDRESS])
+            # TODO: validate mac address is valid format.
+            if not is_host_valid(user_input[CONF_IP_ADDRESS].partition(":")[0]):
+                errors[CONF_IP_ADDRESS] = "invalid_host"
+            elif (
+                user_input[CONF_IP_ADDRESS] not in self._candidates
+                and not await self._async_can_connect(user_input[CONF_IP_ADDRESS])
+            ):
+                errors["base"] = "cannot_connect"
             if not errors:
                 await self.async_set_unique_id(user_input[CONF_MAC])
                 return self.async_create_entry(
@@ -50,9 +160,27 @@ class Nexus21ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 )
 
         return self.async_show_form(
-            step_id="user", data_schema=USER_SCHEMA, errors=errors
+            step_id="manual", data_schema=USER_SCHEMA, errors=errors
         )
 
+    async def _async_can_connect(self, host: str) -> bool:
+        # Through the shared module, so a lift that is already set up isn't
+        # sent a second request while it is busy.
+        async with registry.module(host) as ip_module:
+            try:
+                await asyncio.wait_for(
+                    ip_module.get_status(max_age=0), NEXUS21_PROBE_TIMEOUT
+                )
+            except (
+                Nexus21Error,
+                aiohttp.ClientError,
+                asyncio.TimeoutError,
+                ValueError,
+                vol.Invalid,
+            ):
+                return False
+        return True
+
     async def async_step_dhcp(self, discovery_info: DhcpServiceInfo) -> FlowResult:
         await self.async_set_unique_id(discovery_info.macaddress)
 
@@ -5,4 +5,47 @@ DOMAIN = "nexus21"
 NEXUS21_IP_MODULE = "nexus21_ip_module"
 NEXUS21_IP_MODULE_ATTRIBUTES = "nexus21_ip_module_attributes"
 NEXUS21_COORDINATOR = "nexus21_coordinator"
+NEXUS21_EVENT_LISTENER = "nexus21_event_listener"
+NEXUS21_EVENT_SUBSCRIPTION = "nexus21_event_subscription"
+NEXUS21_FIRST_REFRESH = "nexus21_first_refresh"
+NEXUS21_SCHEDULER = "nexus21_scheduler"
+CONF_NETWORK = "network"
+# Seconds between the first refreshes of consecutive entries at startup, wrapping
+# around after STARTUP_SPREAD seconds.
+STARTUP_STAGGER = 0.2
+STARTUP_SPREAD = 10
 UPDATE_INTERVAL = 60
+# Request timeouts of the IP module a refresh may take, see
+# Nexus21IPModule.request_timeout.
+UPDATE_TIMEOUT_FACTOR = 3
+# Polling interval while a lift moves without a transition polling it, e.g.
+# when moved by the remote, and for a while after a command.
+MOVING_UPDATE_INTERVAL = 2
+COMMAND_UPDATE_WINDOW = 30
+# Polls of all entries are made by one scheduler, in batches of at most
+# SCHEDULER_BATCH_SIZE modules of the same network segment, spread evenly
+# across the polling interval.
+SCHEDULER_BATCH_SIZE = 8
+SCHEDULER_SEGMENT_PREFIX = 24
+# Polls due within this many seconds of each other are made together.
+SCHEDULER_BATCH_WINDOW = 0.25
+# Random delay in seconds added to each wakeup of the scheduler.
+SCHEDULER_JITTER = 0.5
+# Fraction of its polling interval after which a module may be polled again,
+# so that it can move to its batch's phase.
+SCHEDULER_EARLIEST = 0.5
+# Polling interval while events are pushed by the IP module, as a safety net.
+PUSH_UPDATE_INTERVAL = 900
+# Seconds between updates of the estimated position while a lift moves.
+POSITION_UPDATE_INTERVAL = 1
+# Seconds within which state writes of an entity are merged into one, 0 writes
+# every change at once.
+STATE_WRITE_COALESCE = 0.5
+# Seconds a cover shows itself opening or closing after a command was accepted
+# without the IP module reporting it moving, 0 waits for the IP module.
+OPTIMISTIC_CONFIRM_DEADLINE = 5
+# Seconds between updates of the diagnostic sensors' statistics.
+STATS_UPDATE_INTERVAL = 60
+SERVICE_MOVE_TO_MEMORY = "move_to_memory"
+# How far, in percent, a requested position may be from a memory position.
+MEMORY_POSITION_TOLERANCE = 5
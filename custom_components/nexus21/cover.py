@@ -1,23 +1,51 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any
+
+import voluptuous as vol
+
 from homeassistant.components.cover import (
+    ATTR_CURRENT_POSITION,
+    ATTR_POSITION,
     CoverEntity,
     CoverEntityFeature,
     CoverDeviceClass,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import entity_platform
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.const import CONF_MAC
+from homeassistant.helpers.event import async_call_later, async_track_time_interval
+from homeassistant.helpers.restore_state import ExtraStoredData, RestoreEntity
+from homeassistant.const import CONF_MAC, STATE_CLOSED, STATE_OPEN
 
 from . import Nexus21Entity
-from .api import Nexus21IPModule, IPModuleStatusResponse, Nexus21Error
+from .api import (
+    NEXUS21_MEMORY_COMMANDS,
+    Nexus21Command,
+    Nexus21IPModule,
+    IPModuleStatusResponse,
+    Nexus21Error,
+    Nexus21CommandSuperseded,
+)
 
 from .const import (
     NEXUS21_IP_MODULE,
     NEXUS21_COORDINATOR,
     DOMAIN,
+    MEMORY_POSITION_TOLERANCE,
+    OPTIMISTIC_CONFIRM_DEADLINE,
+    POSITION_UPDATE_INTERVAL,
+    SERVICE_MOVE_TO_MEMORY,
 )
 
+ATTR_MEMORY = "memory"
+ATTR_UNCONFIRMED = "unconfirmed"
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -25,6 +53,14 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up Nexus21 covers."""
+    # Memory positions are stored on the IP module, moving to one teaches the
+    # cover where it is so that set_cover_position can reach it.
+    entity_platform.async_get_current_platform().async_register_entity_service(
+        SERVICE_MOVE_TO_MEMORY,
+        {vol.Required(ATTR_MEMORY): vol.In(sorted(NEXUS21_MEMORY_COMMANDS))},
+        "async_move_to_memory",
+    )
+
     data = hass.data[DOMAIN][config_entry.entry_id]
     async_add_entities(
         [
@@ -33,49 +69,151 @@ async def async_setup_entry(
                 config_entry,
                 data[NEXUS21_IP_MODULE],
             )
-        ],
-        True,
+        ]
     )
 
 
-class Nexus21Cover(Nexus21Entity, CoverEntity):
+@dataclass
+class Nexus21CoverExtraStoredData(ExtraStoredData):
+    """What the cover learned about its lift, kept across restarts."""
+
+    travel_times: dict[str, float]
+    memory_positions: dict[str, float]
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "travel_times": self.travel_times,
+            "memory_positions": self.memory_positions,
+        }
+
+    @classmethod
+    def from_dict(cls, restored: dict[str, Any]) -> Nexus21CoverExtraStoredData:
+        return cls(
+            restored.get("travel_times", {}),
+            restored.get("memory_positions", {}),
+        )
+
+
+class Nexus21Cover(Nexus21Entity, CoverEntity, RestoreEntity):
     """Representation of a Nexus21 cover."""
 
-    """Set by async_update during HASS startup instead of __init__"""
-    _status: IPModuleStatusResponse = None
+    _unsub_position_updates: CALLBACK_TYPE = None
+    _restored_status: IPModuleStatusResponse | None = None
+    # Command accepted by the IP module that the cover shows itself moving for
+    # before any status confirms it, and in which direction.
+    _optimistic_command: str | None = None
+    _optimistic_direction = 0
+    _unsub_optimistic_deadline: CALLBACK_TYPE | None = None
 
     def __init__(
         self, coordinator, config_entry: ConfigEntry, ip_module: Nexus21IPModule
     ):
         """Initialize with API object."""
         super().__init__(coordinator, config_entry, ip_module)
-        self._attr_supported_features = CoverEntityFeature.OPEN
-        self._attr_supported_features |= CoverEntityFeature.CLOSE
         self._attr_unique_id = config_entry.data[CONF_MAC]
         # TODO add a config option to indicate whether this is horizontal or vertical. Also
         # think of a ceiling mount. Up or down is flipped compared to my pool TV.
         self._attr_device_class = CoverDeviceClass.GARAGE
 
+    @property
+    def _status(self) -> IPModuleStatusResponse | None:
+        """Latest status, kept by the coordinator.
+
+        Until the IP module first answers, the state from before the restart
+        is shown instead.
+        """
+        if self.coordinator.data is None:
+            return self._restored_status
+        return self.coordinator.data
+
+    @property
+    def supported_features(self) -> int:
+        features = CoverEntityFeature.OPEN | CoverEntityFeature.CLOSE
+        if self._ip_module.position_estimator.memory:
+            # Between the ends only memory positions can be reached.
+            features |= CoverEntityFeature.SET_POSITION
+        return features
+
+    @property
+    def extra_restore_state_data(self) -> Nexus21CoverExtraStoredData:
+        return Nexus21CoverExtraStoredData(
+            self._ip_module.travel_times.as_dict(),
+            dict(self._ip_module.position_estimator.memory),
+        )
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Whether opening or closing is shown before the IP module reported it."""
+        return {ATTR_UNCONFIRMED: self._optimistic_command is not None}
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self._ip_module.add_command_listener(self._async_command_accepted)
+        )
+        self.async_on_remove(
+            self._ip_module.add_status_listener(self._async_status_received)
+        )
+
+        estimator = self._ip_module.position_estimator
+        if (extra_data := await self.async_get_last_extra_data()) is not None:
+            stored = Nexus21CoverExtraStoredData.from_dict(extra_data.as_dict())
+            self._ip_module.travel_times.restore(stored.travel_times)
+            estimator.restore(None, stored.memory_positions)
+
+        last_state = await self.async_get_last_state()
+        if last_state is None or last_state.state not in (STATE_OPEN, STATE_CLOSED):
+            # Unknown, unavailable or caught while moving: wait for the IP module.
+            return
+
+        vertical = "UP" if last_state.state == STATE_OPEN else "DOWN"
+        self._restored_status = IPModuleStatusResponse(
+            {"STATUS": "OK", "VERTICAL": vertical, "HORIZONTAL": "NA"}
+        )
+        estimator.restore(last_state.attributes.get(ATTR_CURRENT_POSITION), {})
+
+    @property
+    def current_cover_position(self) -> int | None:
+        """Position estimated from the learned travel times between polls."""
+        position = self._ip_module.position
+        return round(position) if position is not None else None
+
     @property
     def is_closed(self) -> bool:
-        return self._status.down and self._status.not_moving
+        return (
+            not self._optimistic_direction
+            and self._status.down
+            and self._status.not_moving
+        )
 
     @property
     def is_closing(self) -> bool:
-        return self._status.moving and self._status.up
+        if self._optimistic_direction:
+            return self._optimistic_direction < 0
+        return (
+            self._status.moving and self._ip_module.position_estimator.direction < 0
+        )
 
     @property
     def is_open(self) -> bool:
-        return self._status.up and self._status.not_moving
+        return (
+            not self._optimistic_direction
+            and self._status.up
+            and self._status.not_moving
+        )
 
     @property
     def is_opening(self) -> bool:
-        return self._status.down and self._status.moving
+        if self._optimistic_direction:
+            return self._optimistic_direction > 0
+        return (
+            self._status.moving and self._ip_module.position_estimator.direction > 0
+        )
 
     @property
     def available(self) -> bool:
         """Return False if state has not been updated yet."""
-        return self._status is not None
+        return super().available and self._status is not None
 
     async def async_close_cover(self, **kwargs: None) -> None:
         """Issue close command to cover."""
@@ -83,10 +221,12 @@ class Nexus21Cover(Nexus21Entity, CoverEntity):
             return
 
         try:
-            duration = await self._ip_module.close(
-                async_progress_callback=self._async_progress_callback
-            )
-        except Nexus21Error as error:
+            await self._ip_module.close()
+        except Nexus21CommandSuperseded:
+            # A newer command replaced this one.
+            return
+        except (Nexus21Error, asyncio.TimeoutError) as error:
+            self._async_roll_back()
             raise HomeAssistantError(
                 f"Opening of cover {self._ip_module.host} failed with error: {error}"
             ) from error
@@ -97,18 +237,142 @@ class Nexus21Cover(Nexus21Entity, CoverEntity):
             return
 
         try:
-            duration = await self._ip_module.open(
-                async_progress_callback=self._async_progress_callback
-            )
-        except Nexus21Error as error:
+            await self._ip_module.open()
+        except Nexus21CommandSuperseded:
+            # A newer command replaced this one.
+            return
+        except (Nexus21Error, asyncio.TimeoutError) as error:
+            self._async_roll_back()
             raise HomeAssistantError(
                 f"Opening of cover {self._ip_module.host} failed with error: {error}"
             ) from error
 
-    async def _async_progress_callback(self, status, done):
-        self._status = status
+    async def async_set_cover_position(self, **kwargs) -> None:
+        """Move to the top, the bottom or a memory position near the target.
+
+        The IP module has no stop command so other positions can't be reached.
+        """
+        position = kwargs[ATTR_POSITION]
+        if position == 0:
+            return await self.async_close_cover()
+        elif position == 100:
+            return await self.async_open_cover()
+
+        command = self._ip_module.position_estimator.memory_near(
+            position, MEMORY_POSITION_TOLERANCE
+        )
+        if command is None:
+            raise HomeAssistantError(
+                f"Cover {self._ip_module.host} has no memory position near {position}"
+            )
+        await self.async_move_to_memory(command)
+
+    async def async_move_to_memory(self, memory: str) -> None:
+        """Move to one of the IP module's memory positions."""
+        try:
+            await self._ip_module.move(memory)
+        except Nexus21CommandSuperseded:
+            return
+        except (Nexus21Error, asyncio.TimeoutError) as error:
+            self._async_roll_back()
+            raise HomeAssistantError(
+                f"Moving cover {self._ip_module.host} to {memory} failed with error: {error}"
+            ) from error
+
+    @callback
+    def _async_command_accepted(self, command: str) -> None:
+        """Show the lift moving as soon as the IP module accepted `command`.
+
+        This lasts until a status confirms it, or is rolled back to what the
+        IP module reports if none has after OPTIMISTIC_CONFIRM_DEADLINE.
+        """
+        self._async_end_optimistic()
+        if not OPTIMISTIC_CONFIRM_DEADLINE:
+            return
+
+        estimator = self._ip_module.position_estimator
+        if estimator.position() is not None:
+            # 0 if the lift is there already.
+            direction = estimator.direction
+        elif command == Nexus21Command.UP.name:
+            direction = 1
+        elif command == Nexus21Command.DOWN.name:
+            direction = -1
+        else:
+            direction = 0
+        if not direction:
+            return
+
+        self._optimistic_command = command
+        self._optimistic_direction = direction
+        self._unsub_optimistic_deadline = async_call_later(
+            self.hass, OPTIMISTIC_CONFIRM_DEADLINE, self._async_optimistic_expired
+        )
+        self._update_position_tracking()
+        self._async_write_immediately()
+
+    @callback
+    def _async_status_received(self, status: IPModuleStatusResponse) -> None:
+        command = self._optimistic_command
+        if command is None:
+            return
+        if (
+            status.moving
+            or (command == Nexus21Command.UP.name and status.up)
+            or (command == Nexus21Command.DOWN.name and status.down)
+        ):
+            # Confirmed, from here on the status tells.
+            self._async_end_optimistic()
+            self._async_write_coalesced()
+
+    @callback
+    def _async_optimistic_expired(self, now=None) -> None:
+        self._unsub_optimistic_deadline = None
+        self._async_roll_back()
+
+    @callback
+    def _async_roll_back(self) -> None:
+        """Show what the IP module reports instead of an unconfirmed move."""
+        if self._optimistic_command is None:
+            return
+        self._async_end_optimistic()
+        self._async_write_immediately()
+
+    @callback
+    def _async_end_optimistic(self) -> None:
+        if self._unsub_optimistic_deadline is not None:
+            self._unsub_optimistic_deadline()
+            self._unsub_optimistic_deadline = None
+        self._optimistic_command = None
+        self._optimistic_direction = 0
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        self._update_position_tracking()
+        super()._handle_coordinator_update()
+
+    def _update_position_tracking(self) -> None:
+        if not self._ip_module.position_estimator.moving:
+            self._stop_position_updates()
+        elif self._unsub_position_updates is None:
+            # Move the position along without polling the IP module.
+            self._unsub_position_updates = async_track_time_interval(
+                self.hass,
+                self._async_update_position,
+                timedelta(seconds=POSITION_UPDATE_INTERVAL),
+            )
+
+    async def _async_update_position(self, now=None) -> None:
+        if not self._ip_module.position_estimator.moving:
+            self._stop_position_updates()
         self.async_write_ha_state()
 
-    async def async_update(self) -> None:
-        status = await self._ip_module.get_status()
-        self._status = status
+    def _stop_position_updates(self) -> None:
+        if self._unsub_position_updates is not None:
+            self._unsub_position_updates()
+            self._unsub_position_updates = None
+
+    async def async_will_remove_from_hass(self) -> None:
+        self._stop_position_updates()
+        self._async_end_optimistic()
+        await super().async_will_remove_from_hass()
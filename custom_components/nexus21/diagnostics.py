@@ -0,0 +1,44 @@
+"""Diagnostics support for Nexus21."""
+from __future__ import annotations
+
+from dataclasses import asdict
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_MAC
+from homeassistant.core import HomeAssistant
+
+from .api import Nexus21IPModule
+from .const import DOMAIN, NEXUS21_COORDINATOR, NEXUS21_IP_MODULE, NEXUS21_SCHEDULER
+
+TO_REDACT = {CONF_MAC}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    ip_module: Nexus21IPModule = hass.data[DOMAIN][entry.entry_id][NEXUS21_IP_MODULE]
+    coordinator = hass.data[DOMAIN][entry.entry_id][NEXUS21_COORDINATOR]
+
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "last_status": repr(ip_module.last_status),
+        "status_age": ip_module.status_age if ip_module.last_status else None,
+        "queue_depth": ip_module.queue_depth,
+        "breaker": ip_module.breaker.as_dict(),
+        "round_trip": ip_module.round_trip.as_dict(),
+        "travel_times": ip_module.travel_times.as_dict(),
+        "last_transition": asdict(ip_module.last_transition)
+        if ip_module.last_transition
+        else None,
+        "stats": ip_module.stats.as_dict(),
+        "entity_updates": {
+            "notified": coordinator.updates_notified,
+            "suppressed": coordinator.updates_suppressed,
+        },
+        "events_received": coordinator.events_received,
+        "poll_interval": coordinator.poll_interval,
+        "scheduler": hass.data[DOMAIN][NEXUS21_SCHEDULER].as_dict(coordinator),
+    }
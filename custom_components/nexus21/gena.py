@@ -0,0 +1,227 @@
+"""UPnP GENA event subscriptions for the Nexus21 basicevent service.
+
+Kept free of Home Assistant and api imports so it can be used on its own.
+"""
+import asyncio
+import logging
+import secrets
+import xml.etree.ElementTree as ET
+
+import aiohttp
+from aiohttp import web
+
+from typing import Callable, Dict, Optional
+
+NEXUS21_EVENT_PATH = "/upnp/event/basicevent1"
+# Seconds asked for when subscribing, the IP module may grant less.
+NEXUS21_EVENT_TIMEOUT = 1800
+# Renew when this fraction of the granted timeout has passed.
+NEXUS21_EVENT_RENEW_AT = 0.8
+NEXUS21_EVENT_RETRY_MIN = 5
+NEXUS21_EVENT_RETRY_MAX = 300
+
+_LOGGER = logging.getLogger(__name__)
+
+EventCallback = Callable[[Dict[str, str]], None]
+
+
+def parse_propertyset(body: bytes) -> Dict[str, str]:
+    """Variables of an <e:propertyset> NOTIFY body, by name."""
+    properties = {}
+    for prop in ET.fromstring(body):
+        for variable in prop:
+            # Drop any namespace, variables are matched by name.
+            properties[variable.tag.rpartition("}")[2]] = variable.text or ""
+    return properties
+
+
+class Nexus21EventListener:
+    """HTTP server receiving NOTIFY requests for any number of subscriptions."""
+
+    def __init__(self, host: str, port: int = 0) -> None:
+        self.host = host
+        self.port = port
+        self._callbacks: Dict[str, EventCallback] = {}
+        self._runner: Optional[web.AppRunner] = None
+        self._lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        """Start serving, does nothing if already started."""
+        async with self._lock:
+            if self._runner is None:
+                await self._start()
+
+    async def _start(self) -> None:
+        app = web.Application()
+        app.router.add_route("NOTIFY", "/notify/{token}", self._handle_notify)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, self.host, self.port)
+        try:
+            await site.start()
+        except BaseException:
+            # Left unstarted, so that the next start() tries again.
+            await runner.cleanup()
+            raise
+        self._runner = runner
+        if not self.port:
+            self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @property
+    def idle(self) -> bool:
+        """Whether no subscription is registered."""
+        return not self._callbacks
+
+    def register(self, callback: EventCallback) -> str:
+        """Return the callback URL that delivers events to `callback`."""
+        token = secrets.token_hex(8)
+        self._callbacks[token] = callback
+        return f"http://{self.host}:{self.port}/notify/{token}"
+
+    def unregister(self, url: str) -> None:
+        self._callbacks.pop(url.rpartition("/")[2], None)
+
+    async def _handle_notify(self, request: web.Request) -> web.Response:
+        callback = self._callbacks.get(request.match_info["token"])
+        if callback is None or request.headers.get("NT") != "upnp:event":
+            return web.Response(status=412)
+        try:
+            properties = parse_propertyset(await request.read())
+        except ET.ParseError:
+            return web.Response(status=400)
+        callback(properties)
+        return web.Response()
+
+
+class Nexus21EventSubscription:
+    """Keeps a subscription to one IP module's events alive.
+
+    Renews before the granted timeout runs out and subscribes again, with
+    back-off, when renewal fails. `on_state` is told whether events are
+    currently arriving so callers can fall back to polling.
+    """
+
+    sid: Optional[str] = None
+
+    def __init__(
+        self,
+        listener: Nexus21EventListener,
+        host: str,
+        on_event: EventCallback,
+        on_state: Callable[[bool], None] = None,
+        session: aiohttp.ClientSession = None,
+        path: str = NEXUS21_EVENT_PATH,
+        timeout: int = NEXUS21_EVENT_TIMEOUT,
+    ) -> None:
+        self.host = host
+        self.url = f"http://{host}{path}"
+        self.timeout = timeout
+        self._listener = listener
+        self._on_event = on_event
+        self._on_state = on_state
+        self._session = session
+        self._owns_session = session is None
+        self._callback_url: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def subscribed(self) -> bool:
+        return self.sid is not None
+
+    def start(self) -> None:
+        self._callback_url = self._listener.register(self._on_event)
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.sid is not None:
+            try:
+                await self._request("UNSUBSCRIBE", {"SID": self.sid})
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                pass
+            self.sid = None
+        if self._callback_url is not None:
+            self._listener.unregister(self._callback_url)
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _set_sid(self, sid: Optional[str]) -> None:
+        changed = (sid is None) != (self.sid is None)
+        self.sid = sid
+        if changed and self._on_state:
+            self._on_state(sid is not None)
+
+    async def _run(self) -> None:
+        retry = NEXUS21_EVENT_RETRY_MIN
+        while True:
+            try:
+                if self.sid is None:
+                    granted = await self._subscribe()
+                else:
+                    granted = await self._renew()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                _LOGGER.debug("Event subscription to %s failed: %s", self.host, error)
+            except (KeyError, ValueError) as error:
+                # E.g. no SID header, don't let it end the subscription.
+                _LOGGER.warning(
+                    "Malformed event subscription response from %s: %r",
+                    self.host,
+                    error,
+                )
+            else:
+                retry = NEXUS21_EVENT_RETRY_MIN
+                await asyncio.sleep(granted * NEXUS21_EVENT_RENEW_AT)
+                continue
+
+            # Start over with a new subscription.
+            self._set_sid(None)
+            await asyncio.sleep(retry)
+            retry = min(retry * 2, NEXUS21_EVENT_RETRY_MAX)
+
+    async def _subscribe(self) -> int:
+        response = await self._request(
+            "SUBSCRIBE",
+            {
+                "CALLBACK": f"<{self._callback_url}>",
+                "NT": "upnp:event",
+                "TIMEOUT": f"Second-{self.timeout}",
+            },
+        )
+        self._set_sid(response.headers["SID"])
+        return self._granted(response)
+
+    async def _renew(self) -> int:
+        try:
+            response = await self._request(
+                "SUBSCRIBE", {"SID": self.sid, "TIMEOUT": f"Second-{self.timeout}"}
+            )
+        except aiohttp.ClientResponseError:
+            # The IP module forgot the subscription, start a new one.
+            self._set_sid(None)
+            return await self._subscribe()
+        return self._granted(response)
+
+    def _granted(self, response: aiohttp.ClientResponse) -> int:
+        timeout = response.headers.get("TIMEOUT", "")
+        try:
+            return int(timeout.partition("Second-")[2])
+        except ValueError:
+            return self.timeout
+
+    async def _request(self, method: str, headers: Dict[str, str]):
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        async with self._session.request(
+            method, self.url, headers=headers, timeout=aiohttp.ClientTimeout(total=10)
+        ) as response:
+            response.raise_for_status()
+            return response
@@ -0,0 +1,163 @@
+"""Polling of every Nexus21 IP module from one domain-wide timer."""
+from __future__ import annotations
+
+import asyncio
+import ipaddress
+import itertools
+import math
+import random
+import time
+from typing import TYPE_CHECKING
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+
+from .const import (
+    SCHEDULER_BATCH_SIZE,
+    SCHEDULER_BATCH_WINDOW,
+    SCHEDULER_EARLIEST,
+    SCHEDULER_JITTER,
+    SCHEDULER_SEGMENT_PREFIX,
+)
+
+if TYPE_CHECKING:
+    from . import Nexus21DataUpdateCoordinator
+
+
+def network_segment(host: str) -> str:
+    """The network a host is in, or the host itself if it is a name."""
+    address = host.partition(":")[0]
+    try:
+        return str(
+            ipaddress.ip_network(f"{address}/{SCHEDULER_SEGMENT_PREFIX}", strict=False)
+        )
+    except ValueError:
+        return address
+
+
+class _PollSlot:
+    __slots__ = ("coordinator", "segment", "batch", "phase", "due")
+
+    def __init__(self, coordinator: Nexus21DataUpdateCoordinator) -> None:
+        self.coordinator = coordinator
+        self.segment = network_segment(coordinator.ip_module.host)
+        self.batch = 0
+        # Fraction of the polling interval at which the module is polled.
+        self.phase = 0.0
+        self.due = math.inf
+
+
+class Nexus21PollScheduler:
+    """Decides when each coordinator polls its IP module.
+
+    Modules are put in batches of up to SCHEDULER_BATCH_SIZE, modules of the
+    same network segment together, and each batch gets its own phase spread
+    evenly across the polling interval. A module polls at its batch's phase
+    within whatever interval its coordinator currently wants, so batches
+    with the same interval poll together, and the load on the network is
+    even instead of bursting when all timers started at setup expire.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self._slots: dict[Nexus21DataUpdateCoordinator, _PollSlot] = {}
+        self._timer: asyncio.TimerHandle | None = None
+        self._armed_for = math.inf
+        self.batches = 0
+        self.wakeups = 0
+        self.polls = 0
+
+    @callback
+    def async_add(self, coordinator: Nexus21DataUpdateCoordinator) -> CALLBACK_TYPE:
+        """Schedule the polls of `coordinator` until the returned callback."""
+        self._slots[coordinator] = _PollSlot(coordinator)
+        self._async_assign_phases()
+
+        @callback
+        def remove() -> None:
+            if self._slots.pop(coordinator, None) is not None:
+                self._async_assign_phases()
+
+        return remove
+
+    @callback
+    def async_reschedule(self, coordinator: Nexus21DataUpdateCoordinator) -> None:
+        """Take a new polling interval or poll time of `coordinator` into account."""
+        if (slot := self._slots.get(coordinator)) is None:
+            return
+        slot.due = self._due(slot)
+        if slot.due < self._armed_for:
+            self._async_arm()
+
+    @callback
+    def async_stop(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._armed_for = math.inf
+
+    def as_dict(self, coordinator: Nexus21DataUpdateCoordinator) -> dict:
+        slot = self._slots.get(coordinator)
+        return {
+            "modules": len(self._slots),
+            "batches": self.batches,
+            "wakeups": self.wakeups,
+            "polls": self.polls,
+            "segment": slot.segment if slot else None,
+            "batch": slot.batch if slot else None,
+            "phase": slot.phase if slot else None,
+        }
+
+    @callback
+    def _async_assign_phases(self) -> None:
+        slots = sorted(
+            self._slots.values(),
+            key=lambda slot: (slot.segment, slot.coordinator.ip_module.host),
+        )
+        batches = []
+        for _, segment in itertools.groupby(slots, key=lambda slot: slot.segment):
+            segment = list(segment)
+            for start in range(0, len(segment), SCHEDULER_BATCH_SIZE):
+                batches.append(segment[start : start + SCHEDULER_BATCH_SIZE])
+        self.batches = len(batches)
+        for index, batch in enumerate(batches):
+            for slot in batch:
+                slot.batch = index
+                slot.phase = index / len(batches)
+                slot.due = self._due(slot)
+        self._async_arm()
+
+    def _due(self, slot: _PollSlot) -> float:
+        """The first time at the slot's phase far enough from its last poll."""
+        coordinator = slot.coordinator
+        if coordinator.polled_at is None:
+            # Not refreshed for the first time yet.
+            return math.inf
+        interval = coordinator.poll_interval
+        offset = slot.phase * interval
+        earliest = coordinator.polled_at + interval * SCHEDULER_EARLIEST
+        return math.ceil((earliest - offset) / interval) * interval + offset
+
+    @callback
+    def _async_arm(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        due = min((slot.due for slot in self._slots.values()), default=math.inf)
+        self._armed_for = due
+        if due == math.inf:
+            return
+        delay = due - time.monotonic() + random.uniform(0, SCHEDULER_JITTER)
+        self._timer = self.hass.loop.call_later(max(delay, 0), self._async_run)
+
+    @callback
+    def _async_run(self) -> None:
+        self._timer = None
+        self.wakeups += 1
+        now = time.monotonic()
+        for slot in self._slots.values():
+            if slot.due <= now + SCHEDULER_BATCH_WINDOW:
+                self.polls += 1
+                # Sets the coordinator's polled_at, and with it the next due.
+                slot.coordinator.async_scheduled_refresh()
+                slot.due = self._due(slot)
+        self._async_arm()
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable, Optional
+
+from homeassistant.components.sensor import (
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_MAC, TIME_MILLISECONDS, TIME_SECONDS
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity import EntityCategory
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_track_time_interval
+
+from . import Nexus21Entity
+from .api import Nexus21IPModule, Nexus21ModuleStats
+from .const import (
+    NEXUS21_IP_MODULE,
+    NEXUS21_COORDINATOR,
+    DOMAIN,
+    STATS_UPDATE_INTERVAL,
+)
+
+
+def _milliseconds(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+def _transition_duration(stats: Nexus21ModuleStats, command: str) -> Optional[float]:
+    histogram = stats.transition_duration.get(command)
+    if histogram is None or histogram.mean is None:
+        return None
+    return round(histogram.mean, 1)
+
+
+@dataclass
+class Nexus21SensorEntityDescription(SensorEntityDescription):
+    value_fn: Callable[[Nexus21ModuleStats], Optional[float]] = None
+
+
+SENSORS: tuple[Nexus21SensorEntityDescription, ...] = (
+    Nexus21SensorEntityDescription(
+        key="request_latency_p50",
+        name="Request latency p50",
+        native_unit_of_measurement=TIME_MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda stats: _milliseconds(stats.request_latency.percentile(50)),
+    ),
+    Nexus21SensorEntityDescription(
+        key="request_latency_p99",
+        name="Request latency p99",
+        native_unit_of_measurement=TIME_MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda stats: _milliseconds(stats.request_latency.percentile(99)),
+    ),
+    Nexus21SensorEntityDescription(
+        key="command_wait_p99",
+        name="Command wait p99",
+        native_unit_of_measurement=TIME_MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda stats: _milliseconds(stats.queue.command_wait.percentile(99)),
+    ),
+    Nexus21SensorEntityDescription(
+        key="poll_wait_p99",
+        name="Poll wait p99",
+        native_unit_of_measurement=TIME_MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda stats: _milliseconds(stats.queue.poll_wait.percentile(99)),
+    ),
+    Nexus21SensorEntityDescription(
+        key="polls_per_transition",
+        name="Polls per transition",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda stats: stats.transition_polls.mean,
+    ),
+    Nexus21SensorEntityDescription(
+        key="open_duration",
+        name="Open duration",
+        native_unit_of_measurement=TIME_SECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda stats: _transition_duration(stats, "UP"),
+    ),
+    Nexus21SensorEntityDescription(
+        key="close_duration",
+        name="Close duration",
+        native_unit_of_measurement=TIME_SECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda stats: _transition_duration(stats, "DOWN"),
+    ),
+    Nexus21SensorEntityDescription(
+        key="timeouts",
+        name="Timeouts",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda stats: stats.timeouts + stats.transition_timeouts,
+    ),
+    Nexus21SensorEntityDescription(
+        key="errors",
+        name="Errors",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda stats: stats.errors,
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up Nexus21 performance sensors."""
+    data = hass.data[DOMAIN][config_entry.entry_id]
+    async_add_entities(
+        Nexus21PerformanceSensor(
+            data[NEXUS21_COORDINATOR],
+            config_entry,
+            data[NEXUS21_IP_MODULE],
+            description,
+        )
+        for description in SENSORS
+    )
+
+
+class Nexus21PerformanceSensor(Nexus21Entity, SensorEntity):
+    """Diagnostic sensor reporting request and transition statistics."""
+
+    entity_description: Nexus21SensorEntityDescription
+
+    def __init__(
+        self,
+        coordinator,
+        config_entry: ConfigEntry,
+        ip_module: Nexus21IPModule,
+        description: Nexus21SensorEntityDescription,
+    ):
+        super().__init__(coordinator, config_entry, ip_module)
+        self.entity_description = description
+        self._attr_entity_category = EntityCategory.DIAGNOSTIC
+        self._attr_unique_id = f"{config_entry.data[CONF_MAC]}_{description.key}"
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        # The statistics change with every request, which the coordinator
+        # doesn't pass on while the status stays the same.
+        self.async_on_remove(
+            async_track_time_interval(
+                self.hass,
+                self._async_update_stats,
+                timedelta(seconds=STATS_UPDATE_INTERVAL),
+            )
+        )
+
+    @callback
+    def _async_update_stats(self, now=None) -> None:
+        self._async_write_coalesced()
+
+    @property
+    def available(self) -> bool:
+        """Always, the statistics count failures too."""
+        return True
+
+    @property
+    def name(self):
+        return f"{super().name} {self.entity_description.name}"
+
+    @property
+    def native_value(self) -> Optional[float]:
+        return self.entity_description.value_fn(self._ip_module.stats)
@@ -0,0 +1,9 @@
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+# api.py is standalone, imported the same way as by the benchmarks and client.
+sys.path.insert(0, os.path.join(ROOT, "custom_components", "nexus21"))
+# The integration itself, for the tests that run it in Home Assistant.
+sys.path.insert(0, ROOT)
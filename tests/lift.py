@@ -0,0 +1,61 @@
+"""A lift behind a Nexus21IPModule transport, without HTTP."""
+
+import asyncio
+from typing import Any, Dict, Iterable, List
+
+
+class FakeLift:
+    """Takes `travel_time` seconds from the bottom to the top.
+
+    Positions run from 0 (down) to 1 (up), `memory` gives the position of
+    each MEM command. Like the IP module, UP is reported at any position
+    above the bottom.
+    """
+
+    def __init__(
+        self,
+        vertical: str = "DOWN",
+        travel_time: float = 0.2,
+        timeouts: Iterable[int] = (),
+        memory: Dict[str, float] = None,
+    ) -> None:
+        self.position = 1.0 if vertical == "UP" else 0.0
+        """Where the lift stands, or is heading while it moves."""
+        self.travel_time = travel_time
+        self.memory = memory or {}
+        self.moving_until = float("-inf")
+        self._origin = self.position
+        self._began_at = float("-inf")
+        self.commands: List[str] = []
+        self.polls = 0
+        # Polls, counted from 1, that time out instead of answering.
+        self.timeouts = set(timeouts)
+
+    def position_at(self, now: float) -> float:
+        if now >= self.moving_until:
+            return self.position
+        done = (now - self._began_at) / (self.moving_until - self._began_at)
+        return self._origin + (self.position - self._origin) * done
+
+    async def __call__(self, method: str, service: str, payload: Any) -> Any:
+        await asyncio.sleep(0)
+        now = asyncio.get_running_loop().time()
+        if method == "POST":
+            command = payload["COMMAND"]
+            self.commands.append(command)
+            target = {"UP": 1.0, "DOWN": 0.0}.get(command, self.memory.get(command))
+            current = self.position_at(now)
+            if target is not None and target != current:
+                self._origin = current
+                self.position = target
+                self._began_at = now
+                self.moving_until = now + abs(target - current) * self.travel_time
+            return {"STATUS": "OK"}
+        self.polls += 1
+        if self.polls in self.timeouts:
+            raise asyncio.TimeoutError()
+        if now < self.moving_until:
+            vertical = "MOVING"
+        else:
+            vertical = "DOWN" if self.position == 0 else "UP"
+        return {"STATUS": "OK", "VERTICAL": vertical, "HORIZONTAL": "NA"}
@@ -0,0 +1,24 @@
+from api import Nexus21CircuitBreaker
+
+
+def test_breaker():
+    breaker = Nexus21CircuitBreaker(threshold=2, backoff=0, max_backoff=0)
+    assert breaker.allow()
+    breaker.failure()
+    assert breaker.closed
+    breaker.failure()
+    assert not breaker.closed
+    # One request is let through once the back-off has passed.
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.success()
+    assert breaker.closed and breaker.allow()
+
+
+def test_breaker_backoff():
+    breaker = Nexus21CircuitBreaker(threshold=1, backoff=5, max_backoff=300)
+    breaker.failure()
+    assert not breaker.allow()
+    assert 0 < breaker.retry_in <= 5
+    breaker.failure()
+    assert breaker.backoff == 10
@@ -0,0 +1,87 @@
+"""Searching for IP modules in the config flow, needs pytest-homeassistant-custom-component."""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant import config_entries, data_entry_flow  # noqa: E402
+from pytest_homeassistant_custom_component.common import mock_component  # noqa: E402
+
+from custom_components.nexus21.api import Nexus21ProbeResult  # noqa: E402
+from custom_components.nexus21.const import CONF_NETWORK, DOMAIN  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    yield
+
+
+@pytest.fixture
+def found():
+    """Hosts the search finds once the returned event is set."""
+    release = asyncio.Event()
+    searched = []
+
+    async def scan(network):
+        searched.append(network)
+        await release.wait()
+        yield Nexus21ProbeResult(host="192.168.0.39", status=None, rtt=0.1)
+
+    with patch("custom_components.nexus21.config_flow.scan", scan):
+        yield release, searched
+
+
+async def start_scan(hass):
+    for dependency in ("network", "ssdp"):
+        mock_component(hass, dependency)
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": config_entries.SOURCE_USER}
+    )
+    return await hass.config_entries.flow.async_configure(
+        result["flow_id"], {"next_step_id": "scan"}
+    )
+
+
+async def test_scan_invalid_network(hass, found):
+    result = await start_scan(hass)
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], {CONF_NETWORK: "192.168.0"}
+    )
+    assert result["type"] == data_entry_flow.FlowResultType.FORM
+    assert result["errors"] == {CONF_NETWORK: "invalid_network"}
+    assert found[1] == []
+
+
+async def test_scan_offers_found_hosts(hass, found):
+    release, searched = found
+    result = await start_scan(hass)
+    flow_id = result["flow_id"]
+    result = await hass.config_entries.flow.async_configure(
+        flow_id, {CONF_NETWORK: "192.168.0.1/24"}
+    )
+    assert result["type"] == data_entry_flow.FlowResultType.SHOW_PROGRESS
+    await asyncio.sleep(0)
+    assert searched == ["192.168.0.0/24"]
+
+    # Still searching.
+    result = await hass.config_entries.flow.async_configure(flow_id)
+    assert result["type"] == data_entry_flow.FlowResultType.SHOW_PROGRESS
+
+    release.set()
+    await hass.async_block_till_done()
+    result = await hass.config_entries.flow.async_configure(flow_id)
+    assert result["type"] == data_entry_flow.FlowResultType.FORM
+    assert result["step_id"] == "pick"
+
+
+async def test_scan_stops_with_flow(hass, found):
+    result = await start_scan(hass)
+    await hass.config_entries.flow.async_configure(
+        result["flow_id"], {CONF_NETWORK: "192.168.0.0/24"}
+    )
+    hass.config_entries.flow.async_abort(result["flow_id"])
+    await hass.async_block_till_done()
+    assert not hass.config_entries.flow.async_progress()
@@ -0,0 +1,97 @@
+"""The cover entity in Home Assistant, needs pytest-homeassistant-custom-component."""
+
+from unittest.mock import patch
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.components.cover import (  # noqa: E402
+    ATTR_CURRENT_POSITION,
+    ATTR_POSITION,
+    DOMAIN as COVER_DOMAIN,
+    SERVICE_CLOSE_COVER,
+    SERVICE_OPEN_COVER,
+    SERVICE_SET_COVER_POSITION,
+    CoverEntityFeature,
+)
+from homeassistant.const import ATTR_ENTITY_ID, ATTR_SUPPORTED_FEATURES  # noqa: E402
+from pytest_homeassistant_custom_component.common import (  # noqa: E402
+    MockConfigEntry,
+    mock_component,
+)
+
+from custom_components.nexus21.api import registry  # noqa: E402
+from custom_components.nexus21.const import (  # noqa: E402
+    DOMAIN,
+    NEXUS21_COORDINATOR,
+    SERVICE_MOVE_TO_MEMORY,
+)
+from lift import FakeLift  # noqa: E402
+
+HOST = "127.0.0.1:9"
+ENTITY_ID = "cover.lift"
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations, socket_enabled):
+    yield
+
+
+@pytest.fixture
+async def lift(hass):
+    """A lift set up as a config entry, its IP module answered by FakeLift."""
+    lift = FakeLift(travel_time=1.8, memory={"MEM2": 0.45})
+    module = registry.acquire(HOST, transport=lift)
+    for dependency in ("network", "ssdp"):
+        mock_component(hass, dependency)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={"name": "Lift", "ip_address": HOST, "mac": "80:1f:12:00:00:01"},
+    )
+    entry.add_to_hass(hass)
+    # The test harness reports a source address that can't be bound.
+    with patch(
+        "custom_components.nexus21.async_get_source_ip", return_value="127.0.0.1"
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.data[DOMAIN][entry.entry_id][NEXUS21_COORDINATOR].async_refresh()
+    await hass.async_block_till_done()
+    yield lift
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    await registry.release(module)
+
+
+async def call(hass, domain, service, **data):
+    await hass.services.async_call(
+        domain, service, {ATTR_ENTITY_ID: ENTITY_ID, **data}, blocking=True
+    )
+    await hass.async_block_till_done()
+
+
+def supports_position(hass) -> bool:
+    features = hass.states.get(ENTITY_ID).attributes[ATTR_SUPPORTED_FEATURES]
+    return bool(features & CoverEntityFeature.SET_POSITION)
+
+
+async def test_memory_position_learned_and_reached(hass, lift):
+    assert hass.states.get(ENTITY_ID).state == "closed"
+    # Nothing but the ends can be reached yet.
+    assert not supports_position(hass)
+
+    # A full travel teaches the speed, moving to MEM2 from the bottom then
+    # teaches where MEM2 is.
+    await call(hass, COVER_DOMAIN, SERVICE_OPEN_COVER)
+    await call(hass, COVER_DOMAIN, SERVICE_CLOSE_COVER)
+    await call(hass, DOMAIN, SERVICE_MOVE_TO_MEMORY, memory="MEM2")
+    assert supports_position(hass)
+    position = hass.states.get(ENTITY_ID).attributes[ATTR_CURRENT_POSITION]
+    # Only as precise as the polls, which are a second apart.
+    assert 0 < position < 100
+
+    await call(hass, COVER_DOMAIN, SERVICE_CLOSE_COVER)
+    assert lift.position == 0
+    await call(hass, COVER_DOMAIN, SERVICE_SET_COVER_POSITION, **{ATTR_POSITION: position})
+    assert lift.commands[-1] == "MEM2"
+    assert lift.position == 0.45
@@ -0,0 +1,30 @@
+from api import IPModuleStatusResponse, Nexus21PositionEstimator, Nexus21TravelTimes
+
+
+def status(vertical: str) -> IPModuleStatusResponse:
+    return IPModuleStatusResponse(
+        {"STATUS": "OK", "VERTICAL": vertical, "HORIZONTAL": "NA"}
+    )
+
+
+def test_estimator_full_travel():
+    travel_times = Nexus21TravelTimes()
+    travel_times.learn("UP", 10)
+    estimator = Nexus21PositionEstimator(travel_times)
+    estimator.correct(status("DOWN"))
+    assert estimator.position() == 0
+    estimator.start("UP")
+    assert estimator.moving and estimator.direction == 1
+    estimator.correct(status("MOVING"))
+    estimator.correct(status("UP"))
+    assert not estimator.moving
+    assert estimator.position() == 100
+
+
+def test_estimator_moved_by_remote():
+    estimator = Nexus21PositionEstimator(Nexus21TravelTimes())
+    estimator.correct(status("DOWN"))
+    estimator.correct(status("MOVING"))
+    assert estimator.moving and estimator.direction == 0
+    estimator.correct(status("DOWN"))
+    assert estimator.position() == 0
@@ -0,0 +1,110 @@
+"""Setup of config entries, needs pytest-homeassistant-custom-component."""
+
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+
+pytest.importorskip("pytest_homeassistant_custom_component")
+
+from homeassistant.util import dt as dt_util  # noqa: E402
+from pytest_homeassistant_custom_component.common import (  # noqa: E402
+    MockConfigEntry,
+    async_fire_time_changed,
+    mock_component,
+)
+
+from custom_components.nexus21.api import registry  # noqa: E402
+from custom_components.nexus21.const import (  # noqa: E402
+    DOMAIN,
+    NEXUS21_COORDINATOR,
+    NEXUS21_EVENT_LISTENER,
+    PUSH_UPDATE_INTERVAL,
+    UPDATE_INTERVAL,
+)
+from lift import FakeLift  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations, socket_enabled):
+    yield
+
+
+@pytest.fixture
+async def setup_lift(hass):
+    """Set up a lift on a host, reached from the given source address."""
+    for dependency in ("network", "ssdp"):
+        mock_component(hass, dependency)
+    entries = []
+
+    async def setup(host: str, source_ip: str = "127.0.0.1"):
+        lift = FakeLift()
+        module = registry.acquire(host, transport=lift)
+        entry = MockConfigEntry(
+            domain=DOMAIN,
+            data={"name": host, "ip_address": host, "mac": f"mac-{host}"},
+        )
+        entry.add_to_hass(hass)
+        with patch(
+            "custom_components.nexus21.async_get_source_ip", return_value=source_ip
+        ):
+            assert await hass.config_entries.async_setup(entry.entry_id)
+        coordinator = hass.data[DOMAIN][entry.entry_id][NEXUS21_COORDINATOR]
+        await coordinator.async_refresh()
+        await hass.async_block_till_done()
+        entries.append((entry, module))
+        return entry, coordinator, lift
+
+    yield setup
+    for entry, module in entries:
+        if entry.entry_id in hass.data.get(DOMAIN, {}):
+            assert await hass.config_entries.async_unload(entry.entry_id)
+        await registry.release(module)
+    await hass.async_block_till_done()
+
+
+async def test_push_interval_only_while_events_arrive(hass, setup_lift):
+    _, coordinator, lift = await setup_lift("127.0.0.1:9")
+
+    # Subscribed, but no event has come through yet.
+    coordinator.async_set_push(True)
+    await hass.async_block_till_done()
+    assert coordinator.poll_interval == UPDATE_INTERVAL
+
+    coordinator.async_event_received({"VERTICAL": "DOWN", "HORIZONTAL": "NA"})
+    await hass.async_block_till_done()
+    assert coordinator.poll_interval == PUSH_UPDATE_INTERVAL
+
+    # The lift moved without an event telling of it.
+    lift.position = 1.0
+    coordinator.ip_module.status_ttl = 0
+    await coordinator.async_refresh()
+    assert coordinator.data.up
+    assert coordinator.poll_interval == UPDATE_INTERVAL
+
+
+async def test_event_listener_per_source_address(hass, setup_lift):
+    first, _, _ = await setup_lift("127.0.0.1:9", source_ip="127.0.0.1")
+    await setup_lift("127.0.0.2:9", source_ip="127.0.0.1")
+    third, _, _ = await setup_lift("127.0.0.3:9", source_ip="127.0.0.2")
+    listeners = hass.data[DOMAIN][NEXUS21_EVENT_LISTENER]
+    assert listeners.keys() == {"127.0.0.1", "127.0.0.2"}
+
+    # Stopped with the last entry using it.
+    assert await hass.config_entries.async_unload(first.entry_id)
+    assert listeners.keys() == {"127.0.0.1", "127.0.0.2"}
+    assert await hass.config_entries.async_unload(third.entry_id)
+    assert listeners.keys() == {"127.0.0.1"}
+
+
+async def test_diagnostic_sensors_stay_available(hass, setup_lift):
+    _, coordinator, lift = await setup_lift("127.0.0.1:9")
+    lift.timeouts.add(lift.polls + 1)
+    coordinator.ip_module.status_ttl = 0
+    await coordinator.async_refresh()
+    # Past the window state writes are merged in.
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=1))
+    await hass.async_block_till_done()
+    assert not coordinator.last_update_success
+    assert hass.states.get("cover.127_0_0_1_9").state == "unavailable"
+    assert hass.states.get("sensor.127_0_0_1_9_errors").state != "unavailable"
@@ -0,0 +1,16 @@
+import asyncio
+
+from api import probe, registry
+
+
+def test_probe_malformed_reply():
+    """A reply that isn't JSON is no IP module, also through the registry."""
+
+    async def transport(method, service, payload):
+        raise ValueError("Expecting value: line 1 column 1 (char 0)")
+
+    async def run():
+        async with registry.module("malformed", transport=transport):
+            assert await probe("malformed") is None
+
+    asyncio.run(run())
@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from api import Nexus21CommandSuperseded, Nexus21RequestQueue
+
+
+class Requests:
+    """Request factories that record the order they are sent in."""
+
+    def __init__(self) -> None:
+        self.sent = []
+        self.release = asyncio.Event()
+
+    def factory(self, name: str, wait: bool = False):
+        async def request():
+            self.sent.append(name)
+            if wait:
+                await self.release.wait()
+            return name
+
+        return request
+
+
+def test_queue_commands_ahead_of_polls():
+    async def run():
+        queue = Nexus21RequestQueue()
+        requests = Requests()
+        first = asyncio.ensure_future(queue.poll(requests.factory("busy", wait=True)))
+        await asyncio.sleep(0)
+        poll = asyncio.ensure_future(queue.poll(requests.factory("poll")))
+        command = asyncio.ensure_future(queue.command("UP", requests.factory("UP")))
+        await asyncio.sleep(0)
+        assert queue.depth == 2
+        requests.release.set()
+        assert await asyncio.gather(first, poll, command) == ["busy", "poll", "UP"]
+        assert requests.sent == ["busy", "UP", "poll"]
+
+    asyncio.run(run())
+
+
+def test_queue_merges_polls():
+    async def run():
+        queue = Nexus21RequestQueue()
+        requests = Requests()
+        busy = asyncio.ensure_future(queue.command("UP", requests.factory("UP", True)))
+        await asyncio.sleep(0)
+        polls = [
+            asyncio.ensure_future(queue.poll(requests.factory(f"poll{index}")))
+            for index in range(3)
+        ]
+        await asyncio.sleep(0)
+        requests.release.set()
+        await busy
+        assert await asyncio.gather(*polls) == ["poll0"] * 3
+        assert requests.sent == ["UP", "poll0"]
+        assert queue.stats.merged == 2
+
+    asyncio.run(run())
+
+
+def test_queue_supersedes_queued_command():
+    async def run():
+        queue = Nexus21RequestQueue()
+        requests = Requests()
+        busy = asyncio.ensure_future(queue.poll(requests.factory("busy", wait=True)))
+        await asyncio.sleep(0)
+        up = asyncio.ensure_future(queue.command("UP", requests.factory("UP")))
+        joined = asyncio.ensure_future(queue.command("UP", requests.factory("UP")))
+        await asyncio.sleep(0)
+        down = asyncio.ensure_future(queue.command("DOWN", requests.factory("DOWN")))
+        await asyncio.sleep(0)
+        requests.release.set()
+        await busy
+        with pytest.raises(Nexus21CommandSuperseded):
+            await up
+        with pytest.raises(Nexus21CommandSuperseded):
+            await joined
+        assert await down == "DOWN"
+        assert requests.sent == ["busy", "DOWN"]
+        assert queue.stats.superseded == 1
+
+    asyncio.run(run())
+
+
+def test_queue_started_request_is_finished():
+    async def run():
+        queue = Nexus21RequestQueue()
+        requests = Requests()
+        up = asyncio.ensure_future(queue.command("UP", requests.factory("UP", True)))
+        await asyncio.sleep(0)
+        down = asyncio.ensure_future(queue.command("DOWN", requests.factory("DOWN")))
+        await asyncio.sleep(0)
+        requests.release.set()
+        assert await asyncio.gather(up, down) == ["UP", "DOWN"]
+
+    asyncio.run(run())
+
+
+def test_queue_aclose():
+    async def run():
+        queue = Nexus21RequestQueue()
+        requests = Requests()
+        running = asyncio.ensure_future(queue.poll(requests.factory("busy", True)))
+        await asyncio.sleep(0)
+        queued = asyncio.ensure_future(queue.command("UP", requests.factory("UP")))
+        await asyncio.sleep(0)
+        await queue.aclose()
+        for request in (running, queued):
+            with pytest.raises(asyncio.CancelledError):
+                await request
+        assert requests.sent == ["busy"]
+        assert queue.depth == 0
+
+    asyncio.run(run())
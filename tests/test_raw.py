@@ -0,0 +1,149 @@
+import asyncio
+
+import pytest
+
+from api import (
+    Nexus21IPModule,
+    Nexus21InvalidResponse,
+    Nexus21RawConnection,
+    Nexus21RawUnsupported,
+)
+
+STATUS = b'{"STATUS": "OK", "VERTICAL": "UP", "HORIZONTAL": "NA"}'
+
+
+@pytest.fixture(autouse=True)
+def local_server(request):
+    """Let the tests reach their server past pytest-socket, if installed."""
+    try:
+        request.getfixturevalue("socket_enabled")
+    except pytest.FixtureLookupError:
+        pass
+
+
+async def read_request(reader: asyncio.StreamReader) -> bytes:
+    """The head of the next request, b"" once the client hung up."""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError:
+        return b""
+    for line in head.split(b"\r\n"):
+        name, _, value = line.partition(b":")
+        if name.lower() == b"content-length":
+            await reader.readexactly(int(value))
+    return head
+
+
+async def serve(*responses):
+    """Answer with `responses` in turn, None hangs up instead of answering.
+
+    Returns the server, its host and the number of connections made so far.
+    """
+    responses = list(responses)
+    connections = []
+
+    async def handle(reader, writer):
+        connections.append(writer)
+        while responses and await read_request(reader):
+            response = responses.pop(0)
+            if response is None:
+                break
+            writer.write(response)
+            await writer.drain()
+            if b"Connection: close" in response:
+                break
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    return server, f"127.0.0.1:{port}", connections
+
+
+def ok(body: bytes = STATUS, headers: bytes = b"") -> bytes:
+    return (
+        b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+        + headers
+        + b"Content-Length: %d\r\n\r\n" % len(body)
+        + body
+    )
+
+
+def test_body_ends_with_connection():
+    async def run():
+        server, host, _ = await serve(
+            b"HTTP/1.1 200 OK\r\nConnection: close\r\n\r\n" + STATUS
+        )
+        async with server:
+            raw = Nexus21RawConnection(host)
+            assert (await raw.request("GET", "status", None, 5))["VERTICAL"] == "UP"
+            raw.close()
+
+    asyncio.run(run())
+
+
+def test_chunked_falls_back_to_aiohttp():
+    chunked = (
+        b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+        b"Transfer-Encoding: chunked\r\n\r\n"
+        b"%x\r\n%s\r\n0\r\n\r\n" % (len(STATUS), STATUS)
+    )
+
+    async def run():
+        server, host, connections = await serve(chunked, chunked)
+        async with server:
+            async with Nexus21IPModule(host, raw_http=True) as module:
+                assert (await module.get_status(max_age=0)).up
+                assert module._raw is None
+        assert len(connections) == 2
+
+    asyncio.run(run())
+
+
+def test_response_too_large():
+    async def run():
+        server, host, _ = await serve(ok(b" " * 1024 + STATUS))
+        async with server:
+            raw = Nexus21RawConnection(host, max_response=512)
+            with pytest.raises(Nexus21RawUnsupported):
+                await raw.request("GET", "status", None, 5)
+
+    asyncio.run(run())
+
+
+def test_idle_connection_closed_by_module():
+    """A request on a connection the IP module dropped is sent again."""
+
+    async def run():
+        server, host, connections = await serve(ok(), None, ok())
+        async with server:
+            async with Nexus21IPModule(host, raw_http=True) as module:
+                assert (await module.get_status(max_age=0)).up
+                assert (await module.get_status(max_age=0)).up
+                assert module._raw is not None
+                assert module.stats.errors == 0
+        assert len(connections) == 2
+
+    asyncio.run(run())
+
+
+def test_error_status():
+    async def run():
+        server, host, _ = await serve(
+            b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\n\r\n"
+        )
+        async with server:
+            raw = Nexus21RawConnection(host)
+            with pytest.raises(Nexus21InvalidResponse, match="503"):
+                await raw.request("GET", "status", None, 5)
+            raw.close()
+
+    asyncio.run(run())
+
+
+def test_host_parsing():
+    assert Nexus21RawConnection("192.168.0.39")._address == ("192.168.0.39", 80)
+    assert Nexus21RawConnection("lift:8080")._address == ("lift", 8080)
+    assert Nexus21RawConnection("[fe80::1]:8080")._address == ("fe80::1", 8080)
+    assert Nexus21RawConnection("[::1]")._address == ("::1", 80)
+    with pytest.raises(ValueError):
+        Nexus21RawConnection("fe80::1")
@@ -0,0 +1,66 @@
+"""Replays the recordings in benchmarks/recordings against the transition engine."""
+
+import argparse
+import os
+import sys
+
+import pytest
+
+BENCHMARKS = os.path.join(os.path.dirname(__file__), "..", "benchmarks")
+sys.path.insert(0, BENCHMARKS)
+
+import api  # noqa: E402
+import replay  # noqa: E402
+
+
+def run_recording(name: str, repeat: int = 3):
+    args = argparse.Namespace(
+        repeat=repeat,
+        precision=api.NEXUS21_TRANSITION_POLL_PRECISION,
+        timeout=None,
+        poll_interval=1.0,
+    )
+    exchanges = replay.load_recording(
+        os.path.join(BENCHMARKS, "recordings", f"{name}.ndjson")
+    )
+    with replay.virtual_time() as loop:
+        return loop.run_until_complete(replay.replay(exchanges, args))
+
+
+def test_full_travel():
+    outcomes = run_recording("full_travel")
+    assert [outcome["command"] for outcome in outcomes] == [
+        "DOWN",
+        "UP",
+        "MEM2",
+        "DOWN",
+        "UP",
+    ] * 3
+    assert not [outcome for outcome in outcomes if "error" in outcome]
+    for outcome in outcomes:
+        if outcome["command"] == "UP":
+            # Never reported done before the lift stopped.
+            assert outcome["detected"] >= 3
+
+
+def test_already_positioned():
+    for outcome in run_recording("already_positioned"):
+        assert "error" not in outcome
+        assert outcome["polls"] == 1
+
+
+def test_error_status():
+    for outcome in run_recording("error_status"):
+        assert outcome["error"] == api.Nexus21CommandFailed.__name__
+
+
+def test_stall():
+    for outcome in run_recording("stall"):
+        assert outcome["error"] == "TimeoutError"
+
+
+@pytest.mark.parametrize(
+    "name", ["full_travel", "already_positioned", "error_status", "stall"]
+)
+def test_replay_is_deterministic(name):
+    assert run_recording(name, repeat=2) == run_recording(name, repeat=2)
@@ -0,0 +1,30 @@
+import pytest
+
+from api import Nexus21RoundTripTimer
+
+
+def test_round_trip_timer():
+    timer = Nexus21RoundTripTimer(initial=5, minimum=1, maximum=15)
+    assert timer.timeout == 5
+    timer.sample(0.1)
+    # srtt 0.1 + 4 * rttvar 0.05 is below the minimum.
+    assert timer.srtt == pytest.approx(0.1)
+    assert timer.rttvar == pytest.approx(0.05)
+    assert timer.timeout == 1
+    timer.sample(2.0)
+    assert timer.rttvar == pytest.approx(0.05 + 0.25 * (1.9 - 0.05))
+    assert timer.srtt == pytest.approx(0.1 + 0.125 * 1.9)
+    assert timer.timeout == pytest.approx(timer.srtt + 4 * timer.rttvar)
+
+
+def test_round_trip_timer_backoff():
+    timer = Nexus21RoundTripTimer(initial=5, minimum=1, maximum=15)
+    timer.sample(0.1)
+    timer.timed_out()
+    assert timer.timeout == 2
+    timer.timed_out()
+    timer.timed_out()
+    timer.timed_out()
+    assert timer.timeout == 15
+    timer.sample(0.1)
+    assert timer.timeout == 1
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from api import Nexus21IPModule, Nexus21TransitionSuperseded
+from lift import FakeLift
+
+
+def test_open_close():
+    async def run():
+        lift = FakeLift()
+        async with Nexus21IPModule("lift", transport=lift) as module:
+            await module.open(poll_interval=0.05)
+            assert (await module.get_status(cached_only=True)).up
+            await module.close(poll_interval=0.05)
+            assert (await module.get_status(cached_only=True)).down
+        assert lift.commands == ["UP", "DOWN"]
+
+    asyncio.run(run())
+
+
+def test_reversal_during_final_poll():
+    """A command given while the last progress callback runs is carried out."""
+
+    async def run():
+        lift = FakeLift()
+        async with Nexus21IPModule("lift", transport=lift) as module:
+            closing = None
+
+            async def progress(status, finished):
+                nonlocal closing
+                if finished and closing is None:
+                    closing = asyncio.ensure_future(module.close(poll_interval=0.05))
+                    # Let close() retarget the transition before returning.
+                    await asyncio.sleep(0.01)
+
+            with pytest.raises(Nexus21TransitionSuperseded):
+                await module.open(progress, poll_interval=0.05)
+            assert await closing > 0
+            assert (await module.get_status(cached_only=True)).down
+        assert lift.commands == ["UP", "DOWN"]
+
+    asyncio.run(run())
+
+
+def test_poll_timeout_while_moving():
+    """A slow answer during a move is skipped, not the end of the move."""
+
+    async def run():
+        lift = FakeLift(timeouts=[3])
+        async with Nexus21IPModule("lift", transport=lift) as module:
+            await module.get_status(max_age=0)
+            assert await module.open(poll_interval=0.05) > 0
+            assert (await module.get_status(cached_only=True)).up
+        assert lift.polls > 3
+
+    asyncio.run(run())
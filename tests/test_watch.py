@@ -0,0 +1,21 @@
+import asyncio
+
+import api
+from api import Nexus21IPModule
+
+
+def test_watch_survives_malformed_reply(monkeypatch):
+    monkeypatch.setattr(api, "NEXUS21_WATCH_INTERVAL", 0.01)
+    replies = iter(["SIDEWAYS", "DOWN", "UP"])
+
+    async def transport(method, service, payload):
+        return {"STATUS": "OK", "VERTICAL": next(replies), "HORIZONTAL": "NA"}
+
+    async def run():
+        async with Nexus21IPModule("lift", transport=transport) as module:
+            watch = module.watch()
+            statuses = [(await watch.__anext__()).vertical.name for _ in range(2)]
+            await watch.aclose()
+        assert statuses == ["DOWN", "UP"]
+
+    asyncio.run(asyncio.wait_for(run(), 5))